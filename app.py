@@ -1,20 +1,145 @@
 from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from jsonschema import validate, ValidationError
-from typing import Any, Optional
-import datetime, os, json, uuid, logging, requests, hmac, hashlib
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from jsonschema import ValidationError
+from typing import Optional
+import asyncio, datetime, os, uuid, logging, signal, time
+from pathlib import Path
+
+from athena import codec, compression
+from athena.models import CAPPayload
+from athena.validation import VALIDATORS
+from athena.codegen import load_preferred_validator
+from athena.relay import RelayClient, RelayConfig, RelayItem
+from athena.relay_queue import RelayQueue
+from athena.outbox import Outbox
+from athena.ledger import CAPLedger
+from athena.relay_batch import BatchConfig, BatchRelay
+from athena.idempotency import IdempotencyCache, idempotency_key
+from athena.validation_pool import ValidationPool, check_cap
+from athena.stream_intake import DuplexStreamingResponse, iter_lines, split_signed_line
+from athena.signing import BodyTooLarge, KeyRing, RejectionStats, SignedBody, read_signed, signature_matches
+from athena.replay import NONCE, NonceCache, ReplayConfig, signed_prefix
+from athena.rate_limit import RateLimiter
+from athena.load_shed import LoadShedder
+from athena.metrics import (CAP_CONCURRENCY_LIMIT, CAP_INFLIGHT, CAP_RESULTS, CAP_SHED, RELAY_BREAKER_STATE,
+                            RELAY_QUEUE_DEPTH, RELAY_TIMEOUT_SECONDS, RELAY_WORKERS_BUSY, LabelLimiter, StageTimer, server_timing)
+from athena.breaker import CLOSED, HALF_OPEN, OPEN
+from prometheus_fastapi_instrumentator import Instrumentator
+from athena.log_pipeline import configure_logging
+from starlette.requests import ClientDisconnect
 
 # ----------------------------------------------------
 # Athena CAP Bridge v2 – Secure Autonomous Relay
 # ----------------------------------------------------
 
-logging.basicConfig(
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    level=logging.INFO
-)
+# Log calls only enqueue; a background thread formats and writes (see athena/log_pipeline.py)
+LOG_PIPELINE = configure_logging(logging.INFO)
+
+# RELAY_MODE=sync answers /cap after the bridge round-trip;
+# RELAY_MODE=queue answers 202 and relays from background workers.
+RELAY_MODE = os.getenv("RELAY_MODE", "sync").lower()
+BATCH_MAX_ITEMS = int(os.getenv("CAP_BATCH_MAX_ITEMS", "1000"))
+MAX_BODY_BYTES = int(os.getenv("CAP_MAX_BODY_BYTES", str(8 << 20)))
+# Limit on the decoded size of a Content-Encoding'd body (CAP_MAX_BODY_BYTES applies to the wire bytes)
+MAX_DECOMPRESSED_BYTES = int(os.getenv("CAP_MAX_DECOMPRESSED_BYTES", str(MAX_BODY_BYTES)))
+STREAM_MAX_LINE_BYTES = int(os.getenv("CAP_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+STREAM_INFLIGHT = int(os.getenv("CAP_STREAM_INFLIGHT", "32"))
+KEYRING_POLL_S = float(os.getenv("ATHENA_KEYRING_POLL_S", "5"))
+METRICS_ENABLED = os.getenv("ATHENA_METRICS", "1") != "0"
+# Opt-in: Server-Timing header and a "timing" breakdown in every /cap response
+SERVER_TIMING = os.getenv("ATHENA_SERVER_TIMING", "0") == "1"
+# Per-route HTTP metrics cost a middleware pass on every request; off unless asked for
+METRICS_HTTP = METRICS_ENABLED and os.getenv("ATHENA_METRICS_HTTP", "0") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Key ring: reloaded on SIGHUP and whenever the key file changes
+    app.state.keyring = KeyRing.from_env()
+    app.state.replay = NonceCache(ReplayConfig.from_env())
+    app.state.rate_limiter = RateLimiter.from_env()
+    # Adaptive /cap concurrency limit (ATHENA_SHED_TARGET_MS); None when disabled
+    app.state.shedder = LoadShedder.from_env()
+    lag_task = None
+    if app.state.shedder is not None:
+        lag_task = asyncio.create_task(app.state.shedder.watch_lag())
+        if METRICS_ENABLED:
+            shedder = app.state.shedder
+            CAP_CONCURRENCY_LIMIT.set_function(lambda: int(shedder.limit))
+            CAP_INFLIGHT.set_function(lambda: shedder.inflight)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, app.state.keyring.reload)
+        sighup = True
+    except (NotImplementedError, RuntimeError, ValueError):  # not the main thread, or no SIGHUP
+        sighup = False
+    keyring_task = None
+    if app.state.keyring.path is not None:
+        keyring_task = asyncio.create_task(app.state.keyring.watch(KEYRING_POLL_S))
+    app.state.relay = RelayClient(RelayConfig.from_env())
+    await app.state.relay.start()
+    if METRICS_ENABLED:
+        relay = app.state.relay
+        for state in (CLOSED, OPEN, HALF_OPEN):
+            RELAY_BREAKER_STATE.labels(state).set_function(lambda state=state: int(relay.breaker.state == state))
+        RELAY_TIMEOUT_SECONDS.set_function(relay.timeouts.current)
+    app.state.idempotency = IdempotencyCache.from_env()
+    app.state.validation_pool = ValidationPool.from_env(Path(os.getcwd()), CAP_VALIDATOR)
+    app.state.validation_pool.start()
+    # Append-only record of every validated CAP (LEDGER_DIR); None when disabled
+    app.state.ledger = CAPLedger.from_env()
+    if app.state.ledger is not None:
+        await app.state.ledger.open()
+    app.state.relay_batch = None
+    batch_config = BatchConfig.from_env()
+    if batch_config.enabled:
+        app.state.relay_batch = BatchRelay(app.state.relay, batch_config)
+        await app.state.relay_batch.start()
+    app.state.relay_queue = None
+    app.state.outbox = None
+    replay = []
+    if RELAY_MODE == "queue":
+        app.state.outbox = Outbox.from_env()
+        if app.state.outbox is not None:
+            replay = await app.state.outbox.open()
+        app.state.relay_queue = RelayQueue.from_env(relay_cap_payload, on_done=relay_done)
+        await app.state.relay_queue.start()
+        if METRICS_ENABLED:
+            relay_queue = app.state.relay_queue
+            RELAY_QUEUE_DEPTH.set_function(relay_queue.depth)
+            RELAY_WORKERS_BUSY.set_function(lambda: relay_queue.busy)
+        if batch_config.enabled and app.state.relay_queue.worker_count < batch_config.max_items:
+            logging.warning("RELAY_WORKERS < RELAY_BATCH_MAX_ITEMS: batches will flush on linger, not size")
+    replay_task = asyncio.create_task(replay_outbox(app, replay)) if replay else None
+    yield
+    if replay_task is not None:
+        replay_task.cancel()
+    if keyring_task is not None:
+        keyring_task.cancel()
+    if lag_task is not None:
+        lag_task.cancel()
+    if sighup:
+        loop.remove_signal_handler(signal.SIGHUP)
+    if app.state.relay_queue is not None:
+        await app.state.relay_queue.stop()
+    if app.state.outbox is not None:
+        await app.state.outbox.close()
+    if app.state.relay_batch is not None:
+        await app.state.relay_batch.close()
+    if app.state.ledger is not None:
+        await app.state.ledger.close()
+    await app.state.relay.close()
+    app.state.validation_pool.close()
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse encoded by athena.codec (orjson when installed); compact UTF-8 like Starlette's."""
+
+    def render(self, content) -> bytes:
+        return codec.dumps(content)
 
-app = FastAPI(title="Athena CAP Bridge v2", version="2.4")
+app = FastAPI(title="Athena CAP Bridge v2", version="2.4", lifespan=lifespan,
+              default_response_class=CodecJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,34 +149,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ----------------------------------------------------
-# CAP Payload model
-# ----------------------------------------------------
-class CAPPayload(BaseModel):
-    cap_id: str
-    timestamp: str
-    domain: str
-    context_mode: str
-    advisor_of_record: str
-    outputs: Any
-    cap_extensions: Any
-    integrity: Any
+# Prometheus: /cap stage histograms and result counters (+ optional HTTP metrics) on /metrics
+if METRICS_ENABLED:
+    instrumentator = Instrumentator(excluded_handlers=["/metrics"])
+    if METRICS_HTTP:
+        instrumentator.instrument(app)
+    instrumentator.expose(app, endpoint="/metrics", include_in_schema=False)
 
 # ----------------------------------------------------
-# Load CAP schema
+# Load CAP schema (validator is built once and reused)
 # ----------------------------------------------------
 def load_cap_schema():
     schema_path = os.path.join(os.getcwd(), "schemas", "ATHENA_CAP_SCHEMA_v3_5.json")
     try:
-        with open(schema_path, "r") as f:
-            schema = json.load(f)
+        validator = VALIDATORS.load(schema_path)
         logging.info(f"CAP schema loaded successfully from {schema_path}")
-        return schema
+        return validator
     except Exception as e:
         logging.error(f"Failed to load CAP schema: {e}")
         raise HTTPException(status_code=500, detail="CAP schema missing or invalid.")
 
-CAP_SCHEMA = load_cap_schema()
+REFERENCE_VALIDATOR = load_cap_schema()
+CAP_SCHEMA = REFERENCE_VALIDATOR.schema
+CAP_VALIDATOR = load_preferred_validator(Path(os.getcwd()), REFERENCE_VALIDATOR)
+DOMAIN_LABEL = LabelLimiter(int(os.getenv("ATHENA_METRICS_MAX_DOMAINS", "50")))
+CONTEXT_MODE_LABEL = LabelLimiter(allowed=set(CAP_SCHEMA["properties"]["context_mode"].get("enum", [])))
 
 # ----------------------------------------------------
 # Health routes
@@ -68,90 +190,508 @@ def healthz():
         "time": datetime.datetime.utcnow().isoformat()
     }
 
+@app.get("/stats")
+def stats():
+    result = {"validator": CAP_VALIDATOR.stats(), "validation_pool": app.state.validation_pool.stats(),
+              "relay": app.state.relay.stats()}
+    if app.state.relay_queue is not None:
+        result["relay_queue"] = app.state.relay_queue.stats()
+    if app.state.outbox is not None:
+        result["outbox"] = app.state.outbox.stats()
+    if app.state.relay_batch is not None:
+        result["relay_batch"] = app.state.relay_batch.stats()
+    if app.state.idempotency is not None:
+        result["idempotency"] = app.state.idempotency.stats()
+    if app.state.ledger is not None:
+        result["ledger"] = app.state.ledger.stats()
+    result["keyring"] = app.state.keyring.stats()
+    result["replay"] = app.state.replay.stats()
+    result["rate_limit"] = app.state.rate_limiter.stats()
+    if app.state.shedder is not None:
+        result["load_shed"] = app.state.shedder.stats()
+    result["rejected"] = REJECTIONS.stats()
+    result["intake_compression"] = INTAKE_COMPRESSION.stats()
+    if LOG_PIPELINE is not None:
+        result["logging"] = LOG_PIPELINE.stats()
+    return result
+
 # ----------------------------------------------------
 # HMAC verification helper
 # ----------------------------------------------------
-def verify_signature(secret: str, body: bytes, received_sig: Optional[str]) -> bool:
-    """Verify that HMAC signature header matches body hash."""
-    if not secret or not received_sig:
-        return False
-    computed = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(computed, received_sig)
+def verify_signature(mac, body: bytes, received_sig: Optional[str]) -> bool:
+    """Verify that HMAC signature matches body hash, given a prepared key (KeyRing.mac)."""
+    mac = mac.copy()
+    mac.update(body)
+    return signature_matches(mac.hexdigest(), received_sig)
+
+REJECTIONS = RejectionStats()
+INTAKE_COMPRESSION = compression.CompressionStats()
+
+def admit(request: Request, scope: str, trace_id: str):
+    """Token-bucket admission from headers alone; 429 with Retry-After when the client's
+    bucket for this scope ("cap" or "bulk") is empty."""
+    started = time.perf_counter()
+    limiter = request.app.state.rate_limiter
+    client = limiter.client(request.headers, request.client.host if request.client else None,
+                            request.app.state.keyring)
+    admitted, retry_after = limiter.check(scope, client)
+    if not admitted:
+        REJECTIONS.record("rate_limited", 0, started)
+        logging.warning("[TRACE %s] Request rejected (rate_limited, %s).", trace_id, client,
+                        extra={"trace_id": trace_id, "sample": True})
+        raise HTTPException(status_code=429, detail="Rate limit exceeded, retry later.",
+                            headers={"Retry-After": str(retry_after)})
+
+async def read_signed_body(request: Request, received_sig: Optional[str], trace_id: str,
+                           timer: Optional[StageTimer] = None, scope: str = "cap") -> SignedBody:
+    """Read the body while computing its HMAC; rate-limited, unsigned, unknown-key and
+    stale (v2) requests are refused before any of it is read and oversized ones as soon
+    as they cross CAP_MAX_BODY_BYTES. A Content-Encoding'd body is decoded as it arrives
+    (the HMAC covers the wire bytes) and refused once it decodes past CAP_MAX_DECOMPRESSED_BYTES."""
+    started = time.perf_counter()
+    keyring, replay = request.app.state.keyring, request.app.state.replay
+
+    def reject(reason: str, status: int, detail: str, bytes_read: int = 0, headers: Optional[dict] = None):
+        REJECTIONS.record(reason, bytes_read, started)
+        logging.warning("[TRACE %s] Request rejected (%s).", trace_id, reason, extra={"trace_id": trace_id})
+        raise HTTPException(status_code=status, detail=detail, headers=headers)
+
+    admit(request, scope, trace_id)
+    if not received_sig:
+        reject("missing_signature", 401, "Invalid or missing signature header.")
+    key_id = request.headers.get("x-athena-key-id") or keyring.default_key_id
+    mac, tenant = keyring.mac(key_id)
+    if mac is None:
+        reject("unknown_key", 401, "Invalid or missing signature header.")
+
+    # Signature v2: HMAC over "<timestamp>.<nonce>." + body
+    timestamp, nonce = request.headers.get("x-athena-timestamp"), request.headers.get("x-athena-nonce")
+    if timestamp is None and nonce is None:
+        if replay.config.required:
+            reject("missing_timestamp", 401, "X-Athena-Timestamp and X-Athena-Nonce headers required.")
+    else:
+        if not timestamp or not nonce or not NONCE.match(nonce):
+            reject("bad_nonce", 401, "Invalid X-Athena-Timestamp or X-Athena-Nonce header.")
+        ts = replay.check_timestamp(timestamp)
+        if ts is None:
+            reject("stale", 401, "Request timestamp outside the accepted window.")
+        mac.update(signed_prefix(timestamp, nonce))
+    if timer is not None:
+        timer.mark("verify")
+
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_BODY_BYTES:
+        reject("too_large", 413, f"Request body exceeds {MAX_BODY_BYTES} bytes.")
+    decoder = None
+    try:
+        encoding = compression.parse_content_encoding(request.headers.get("content-encoding"))
+    except compression.UnsupportedEncoding as e:
+        # RFC 7694: tell the client which codings it may use instead
+        reject("unsupported_encoding", 415, str(e), headers={"Accept-Encoding": ", ".join(compression.supported())})
+    if encoding is not None:
+        # v1 signatures cover the wire bytes, so those are what gets relayed with them
+        decoder = compression.Decoder(encoding, MAX_DECOMPRESSED_BYTES, keep_wire=nonce is None)
+    try:
+        body_bytes, digest = await read_signed(request.stream(), mac, MAX_BODY_BYTES, timer, decoder)
+    except BodyTooLarge as e:
+        reject("too_large", 413, str(e), e.bytes_read)
+    except compression.DecodedTooLarge as e:
+        reject("decompressed_too_large", 413, str(e), e.wire_bytes)
+    except ValueError as e:
+        reject("bad_encoding", 400, str(e), decoder.wire_bytes)
+    if timer is not None:
+        timer.mark("read")
+    if decoder is not None:
+        INTAKE_COMPRESSION.record(encoding, decoder.wire_bytes, decoder.decoded_bytes, decoder.seconds)
+    if not signature_matches(digest, received_sig):
+        reject("bad_signature", 401, "Invalid or missing signature header.", len(body_bytes))
+    keyring.verified(key_id)
+    if tenant:
+        logging.info("[TRACE %s] Signed by key %s (tenant %s)", trace_id, key_id, tenant,
+                     extra={"trace_id": trace_id, "tenant": tenant, "sample": True})
+    if nonce is None:
+        if timer is not None:
+            timer.mark("verify")
+        return SignedBody(body_bytes, received_sig, received_sig, encoding,
+                          decoder.wire if decoder is not None else None)
+
+    outcome = replay.add(key_id, nonce, ts)
+    if outcome == "replay":
+        reject("replay", 409, "Request nonce already used.", len(body_bytes))
+    if outcome == "full":
+        reject("nonce_cache_full", 503, "Nonce cache full, retry later.", len(body_bytes))
+    if timer is not None:
+        timer.mark("verify")
+    # v2 retries carry a fresh nonce and signature, so the verified key identifies them;
+    # the signature covers the timestamp and nonce too, so it is not relayed
+    return SignedBody(body_bytes, f"v2:{key_id}", None, encoding)
 
 # ----------------------------------------------------
 # Relay helper
 # ----------------------------------------------------
-def relay_cap_payload(data: dict, trace_id: str):
-    bridge_url = os.getenv("BRIDGE_URL", "")
-    token = os.getenv("RENDER_API_TOKEN", "")
+async def relay_cap_payload(item: RelayItem):
+    """Relay the original signed bytes over the shared pooled client (batched when enabled)."""
+    if app.state.relay_batch is not None:
+        return await app.state.relay_batch.relay(item)
+    return await app.state.relay.relay(item)
 
-    if not bridge_url:
-        logging.warning(f"[TRACE {trace_id}] No BRIDGE_URL set — skipping relay.")
-        return {"relay": "skipped", "reason": "BRIDGE_URL not set"}
+async def relay_done(item: RelayItem, result: dict):
+    """Queued-mode completion hook (final outcomes only; transient failures are retried):
+    acknowledge delivered CAPs in the outbox and dead-letter the rest."""
+    outbox = app.state.outbox
+    if outbox is None:
+        return
+    if result.get("relay") in ("success", "skipped"):
+        await outbox.ack(item.trace_id)
+    else:
+        await outbox.dead_letter(item, result)
 
-    headers = {"Content-Type": "application/json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    try:
-        response = requests.post(f"{bridge_url}/cap", headers=headers, json=data, timeout=10)
-        if response.status_code == 200:
-            logging.info(f"[TRACE {trace_id}] CAP relay succeeded to {bridge_url}")
-            return {"relay": "success", "bridge_status": response.json()}
-        else:
-            logging.warning(f"[TRACE {trace_id}] CAP relay failed: {response.status_code}")
-            return {"relay": "failed", "code": response.status_code, "body": response.text}
-    except Exception as e:
-        logging.error(f"[TRACE {trace_id}] CAP relay exception: {e}")
-        return {"relay": "error", "message": str(e)}
+async def replay_outbox(app: FastAPI, items):
+    """Re-queue CAPs the outbox holds from before the last restart."""
+    for item in items:
+        await app.state.relay_queue.put(item)
 
 # ----------------------------------------------------
 # CAP intake, validation, signature verification & relay
 # ----------------------------------------------------
 @app.post("/cap")
 async def receive_cap(request: Request, x_athena_signature: Optional[str] = Header(None)):
-    trace_id = str(uuid.uuid4())
-    secret = os.getenv("ATHENA_SHARED_SECRET", "")
+    trace_id = request.state.trace_id = str(uuid.uuid4())
+    timer = StageTimer()
+    shedder = request.app.state.shedder
+    if shedder is not None:
+        shed_reason = shedder.acquire()
+        if shed_reason is not None:
+            if METRICS_ENABLED:
+                CAP_SHED.labels(shed_reason).inc()
+            logging.warning("[TRACE %s] Request shed (%s).", trace_id, shed_reason,
+                            extra={"trace_id": trace_id, "sample": True})
+            raise HTTPException(status_code=503, detail="Overloaded, retry later.", headers={"Retry-After": "1"})
+    try:
+        status, content, headers = await handle_cap(request, x_athena_signature, trace_id, timer)
+    except HTTPException as e:
+        record_cap_metrics(request, timer, e.status_code)
+        if SERVER_TIMING:
+            request.state.timing = timer.breakdown_ms()
+        raise
+    finally:
+        if shedder is not None:
+            shedder.release(timer.elapsed(excluding=("relay",)))  # sync relay time is the bridge's
+    record_cap_metrics(request, timer, status)
+    if SERVER_TIMING:
+        timing = timer.breakdown_ms()
+        content = {**content, "timing": timing}  # never mutate a cached idempotent result
+        headers = {**(headers or {}), "Server-Timing": server_timing(timing)}
+    return CodecJSONResponse(status_code=status, content=content, headers=headers)
+
+async def handle_cap(request: Request, x_athena_signature: Optional[str], trace_id: str, timer: StageTimer):
+    # JSON, or MessagePack / CBOR when their decoder is installed
+    media = codec.media_type(request.headers.get("content-type", ""))
+    if not codec.available(media):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Type {media}: decoder not installed.")
 
-    body_bytes = await request.body()
+    # 1️⃣ Verify signature (over the raw bytes, whatever the encoding) while the body streams in
+    signed = await read_signed_body(request, x_athena_signature, trace_id, timer)
 
-    # 1️⃣ Verify signature
-    if not verify_signature(secret, body_bytes, x_athena_signature):
-        logging.warning(f"[TRACE {trace_id}] Signature verification failed.")
-        raise HTTPException(status_code=401, detail="Invalid or missing signature header.")
+    # Retries of an already-accepted CAP get the original result back
+    cache = request.app.state.idempotency
+    if cache is None:
+        status, content, _ = await process_cap(request, signed, media, trace_id, timer)
+        return status, content, None
+    status, content, replayed = await cache.run(
+        idempotency_key(signed.body), signed.identity,
+        lambda: process_cap(request, signed, media, trace_id, timer))
+    return status, content, {"X-Athena-Idempotent-Replay": "true"} if replayed else None
 
+def record_cap_metrics(request: Request, timer: StageTimer, status: int):
+    if not METRICS_ENABLED:
+        return
+    timer.observe()
+    domain, context_mode = getattr(request.state, "cap_labels", (None, None))
+    CAP_RESULTS.labels(str(status), DOMAIN_LABEL(domain), CONTEXT_MODE_LABEL(context_mode)).inc()
+
+async def process_cap(request: Request, signed: SignedBody, media: str, trace_id: str, timer: StageTimer):
+    """Validate and relay one CAP whose signature is verified; returns (status, content, cacheable)."""
+    body_bytes = signed.body
     try:
-        data = json.loads(body_bytes.decode("utf-8"))
-        logging.info(f"[TRACE {trace_id}] CAP received: {data.get('cap_id', 'unknown')}")
+        # 2️⃣ Validate payload (large ones in a pool worker, off the event loop)
+        check = await request.app.state.validation_pool.check_large(body_bytes, media)
+        if check is not None:
+            timer.mark("pool")
+        elif CAP_VALIDATOR.single_pass:
+            check = check_cap(body_bytes, CAP_VALIDATOR, media)  # parse + validate straight from bytes
+            timer.mark("schema")
+        if check is not None:
+            request.state.cap_labels = (check.get("domain"), check.get("context_mode"))
+            if check["status"] != 200:
+                raise HTTPException(status_code=check["status"], detail=check["error"])
+            logging.info("[TRACE %s] CAP received: %s (%d bytes)", trace_id,
+                         check.get("cap_id") or "unknown", len(body_bytes),
+                         extra={"trace_id": trace_id, "sample": True})
+        else:
+            data = codec.decode_body(body_bytes, media)
+            timer.mark("parse")
+            if isinstance(data, dict):
+                request.state.cap_labels = (data.get("domain"), data.get("context_mode"))
+            logging.info("[TRACE %s] CAP received: %s", trace_id, data.get("cap_id", "unknown"),
+                         extra={"trace_id": trace_id, "sample": True})
 
-        # 2️⃣ Validate payload
-        payload = CAPPayload(**data)
-        validate(instance=data, schema=CAP_SCHEMA)
+            payload = CAPPayload(**data)
+            timer.mark("model")
+            CAP_VALIDATOR.validate(data)
+            timer.mark("schema")
 
-        # 3️⃣ Relay if configured
-        relay_result = relay_cap_payload(data, trace_id)
+        # 3️⃣ Relay if configured (queued mode acknowledges before relaying)
+        if signed.wire is not None:
+            # Relayed as received, so the producer's signature still covers it
+            item = RelayItem(trace_id, signed.wire, signed.relay_signature, media, signed.encoding)
+        else:
+            item = RelayItem(trace_id, body_bytes, signed.relay_signature, media)
+        relay_queue = request.app.state.relay_queue
+        if relay_queue is not None:
+            outbox = request.app.state.outbox
+            if relay_queue.full():
+                raise HTTPException(status_code=503, detail="Relay queue full, retry later.")
+            if outbox is not None:
+                await outbox.put(item)
+            if not relay_queue.submit(item):
+                if outbox is not None:
+                    await outbox.ack(trace_id)
+                raise HTTPException(status_code=503, detail="Relay queue full, retry later.")
+            timer.mark("relay")
+            status, content, cacheable = 202, {
+                "status": "CAP accepted",
+                "trace_id": trace_id,
+                "timestamp": datetime.datetime.utcnow().isoformat(),
+                "relay_status": f"/cap/{trace_id}/relay"
+            }, True
+        else:
+            relay_result = await relay_cap_payload(item)
+            timer.mark("relay")
+            status, content, cacheable = 200, {
+                "status": "CAP validated",
+                "trace_id": trace_id,
+                "timestamp": datetime.datetime.utcnow().isoformat(),
+                "relay_result": relay_result
+            }, relay_result.get("relay") in ("success", "skipped")
 
-        return {
-            "status": "CAP validated",
-            "trace_id": trace_id,
-            "timestamp": datetime.datetime.utcnow().isoformat(),
-            "relay_result": relay_result
-        }
+        # Only accepted CAPs are recorded; a 503'd one is retried and recorded then
+        ledger = request.app.state.ledger
+        if ledger is not None:
+            await ledger.append(trace_id, body_bytes, media)
+            timer.mark("ledger")
+        return status, content, cacheable
 
+    except HTTPException:
+        raise
     except ValidationError as ve:
         raise HTTPException(status_code=422, detail=f"CAP schema validation error: {ve.message}")
     except Exception as e:
-        logging.error(f"[TRACE {trace_id}] CAP processing error: {e}")
+        logging.error("[TRACE %s] CAP processing error: %s", trace_id, e, extra={"trace_id": trace_id})
         raise HTTPException(status_code=400, detail=f"Invalid CAP payload: {str(e)}")
 
+def split_batch(body: bytes, content_type: str) -> list:
+    """NDJSON lines (kept as raw bytes) or the elements of a JSON array."""
+    if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+        return [line.strip() for line in body.split(b"\n") if line.strip()]
+    items = codec.loads(body)
+    if not isinstance(items, list):
+        raise ValueError("batch body must be a JSON array or NDJSON")
+    return items
+
+@app.post("/cap/batch")
+async def receive_cap_batch(request: Request, x_athena_signature: Optional[str] = Header(None)):
+    """Many CAPs under one signature over the whole body; answered per item."""
+    trace_id = str(uuid.uuid4())
+    body_bytes = (await read_signed_body(request, x_athena_signature, trace_id, scope="bulk")).body
+    try:
+        items = split_batch(body_bytes, request.headers.get("content-type", ""))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid CAP batch: {str(e)}")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"CAP batch exceeds {BATCH_MAX_ITEMS} items.")
+
+    checks = await request.app.state.validation_pool.check_many(items)
+    results, accepted = [], []
+    for index, (raw, check) in enumerate(zip(items, checks)):
+        entry = {"index": index, **check}
+        results.append(entry)
+        if check["status"] != 200:
+            continue
+        # Batch items carry no per-item signature; relay each CAP's own bytes (NDJSON) or
+        # its canonical encoding (JSON array elements)
+        body = raw if isinstance(raw, bytes) else codec.canonical(raw)
+        entry["trace_id"] = str(uuid.uuid4())
+        accepted.append((entry, RelayItem(entry["trace_id"], body)))
+    logging.info("[TRACE %s] CAP batch received: %d item(s), %d valid", trace_id, len(items), len(accepted),
+                 extra={"trace_id": trace_id})
+
+    relay_queue = request.app.state.relay_queue
+    if relay_queue is not None:
+        outbox = request.app.state.outbox
+        # Persist only what fits now; the rest is refused per item, like /cap's 503
+        fits = relay_queue.room()
+        room, refused = accepted[:fits], accepted[fits:]
+        if outbox is not None:
+            await asyncio.gather(*(outbox.put(item) for _, item in room))
+        for entry, item in room:
+            if relay_queue.submit(item):
+                entry.update(status=202, relay_status=f"/cap/{item.trace_id}/relay")
+                continue
+            if outbox is not None:
+                await outbox.ack(item.trace_id)
+            refused.append((entry, item))
+        for entry, _ in refused:
+            entry.update(status=503, error="Relay queue full, retry later.")
+    else:
+        relay_results = await asyncio.gather(*(relay_cap_payload(item) for _, item in accepted))
+        for (entry, _), relay_result in zip(accepted, relay_results):
+            entry["relay_result"] = relay_result
+
+    ledger = request.app.state.ledger
+    if ledger is not None:
+        for entry, item in accepted:
+            if entry["status"] in (200, 202):  # not the ones refused for queue room
+                await ledger.append(item.trace_id, item.body)
+
+    return {
+        "status": "CAP batch processed",
+        "trace_id": trace_id,
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+        "items": len(items),
+        "accepted": sum(1 for r in results if r["status"] in (200, 202)),
+        "rejected": sum(1 for r in results if r["status"] not in (200, 202)),
+        "results": results,
+    }
+
+@app.post("/cap/stream")
+async def receive_cap_stream(request: Request):
+    """Long-lived NDJSON upload of "<signature>\\t<CAP>" lines, answered line by line.
+    Line signatures cover the CAP alone, so a captured line could be replayed; the
+    endpoint is refused when ATHENA_REQUIRE_REPLAY_PROTECTION is set."""
+    stream_id = str(uuid.uuid4())
+    admit(request, "bulk", stream_id)
+    if request.app.state.replay.config.required:
+        REJECTIONS.record("missing_timestamp", 0, time.perf_counter())
+        logging.warning("[TRACE %s] CAP stream refused: replay protection required.", stream_id,
+                        extra={"trace_id": stream_id})
+        raise HTTPException(status_code=401, detail="Replay protection required; /cap/stream lines carry no "
+                                                    "timestamp or nonce. Use /cap or /cap/batch.")
+    try:
+        encoding = compression.parse_content_encoding(request.headers.get("content-encoding"))
+    except compression.UnsupportedEncoding as e:
+        raise HTTPException(status_code=415, detail=str(e),
+                            headers={"Accept-Encoding": ", ".join(compression.supported())})
+    key_id = request.headers.get("x-athena-key-id")
+    mac, tenant = request.app.state.keyring.mac(key_id)
+    if mac is None:
+        logging.warning("[TRACE %s] Unknown signing key id: %s", stream_id, key_id, extra={"trace_id": stream_id})
+        raise HTTPException(status_code=401, detail="Unknown signing key id.")
+    logging.info("[TRACE %s] CAP stream opened (key %s, tenant %s)", stream_id, key_id or "default", tenant or "-",
+                 extra={"trace_id": stream_id, "tenant": tenant})
+    return DuplexStreamingResponse(stream_cap_results(request, stream_id, mac, encoding),
+                                   media_type="application/x-ndjson")
+
+async def stream_cap_results(request: Request, stream_id: str, mac, encoding: Optional[str] = None):
+    """Reads, validates and relays each line as it arrives (decoding a Content-Encoding'd
+    upload on the fly; line signatures cover the decoded lines). At most CAP_STREAM_INFLIGHT
+    lines are being relayed (sync) or persisted and enqueued (queued mode, waiting for
+    relay queue room) at once; beyond that the upload is not read any further."""
+    relay_queue = request.app.state.relay_queue
+    outbox = request.app.state.outbox
+    ledger = request.app.state.ledger
+    counts = {"lines": 0, "accepted": 0, "rejected": 0}
+    pending = set()
+
+    def result_line(result: dict) -> bytes:
+        counts["accepted" if result["status"] in (200, 202) else "rejected"] += 1
+        return codec.dumps(result) + b"\n"
+
+    async def relay_line(line_no: int, item: RelayItem, check: dict) -> dict:
+        result = {"line": line_no, **check, "trace_id": item.trace_id}
+        if relay_queue is None:
+            result["relay_result"] = await relay_cap_payload(item)
+        else:
+            if outbox is not None:
+                await outbox.put(item)
+            await relay_queue.put(item)
+            result.update(status=202, relay_status=f"/cap/{item.trace_id}/relay")
+        if ledger is not None:
+            await ledger.append(item.trace_id, item.body)
+        return result
+
+    chunks = request.stream()
+    decoder = None
+    if encoding is not None:
+        decoder = compression.Decoder(encoding)
+        chunks = compression.decode_stream(chunks, decoder)
+    try:
+        async for line_no, line in iter_lines(chunks, STREAM_MAX_LINE_BYTES):
+            counts["lines"] += 1
+            if line is None:
+                yield result_line({"line": line_no, "status": 413,
+                                   "error": f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes."})
+                continue
+            signature, cap_bytes = split_signed_line(line)
+            if not verify_signature(mac, cap_bytes, signature):
+                yield result_line({"line": line_no, "status": 401, "error": "Invalid or missing line signature."})
+                continue
+            check = check_cap(cap_bytes, CAP_VALIDATOR)
+            if check["status"] != 200:
+                yield result_line({"line": line_no, **check})
+                continue
+
+            item = RelayItem(str(uuid.uuid4()), cap_bytes, signature)
+            pending.add(asyncio.create_task(relay_line(line_no, item, check)))
+            if len(pending) >= STREAM_INFLIGHT:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield result_line(task.result())
+        for task in asyncio.as_completed(pending):
+            yield result_line(await task)
+    except ClientDisconnect:
+        logging.warning("[TRACE %s] CAP stream client disconnected after %d line(s)", stream_id, counts["lines"],
+                        extra={"trace_id": stream_id})
+        for task in pending:
+            task.cancel()
+        return
+    except ValueError as e:  # undecodable Content-Encoding; lines before it were answered
+        logging.warning("[TRACE %s] CAP stream aborted: %s", stream_id, e, extra={"trace_id": stream_id})
+        for task in asyncio.as_completed(pending):
+            yield result_line(await task)
+        yield codec.dumps({"summary": True, "trace_id": stream_id, "status": 400, "error": str(e), **counts}) + b"\n"
+        return
+    if decoder is not None:
+        INTAKE_COMPRESSION.record(encoding, decoder.wire_bytes, decoder.decoded_bytes, decoder.seconds)
+
+    logging.info("[TRACE %s] CAP stream closed: %s", stream_id, counts, extra={"trace_id": stream_id})
+    yield codec.dumps({"summary": True, "trace_id": stream_id, **counts}) + b"\n"
+
+@app.get("/cap/{trace_id}/relay")
+def relay_status(trace_id: str, request: Request):
+    """Relay outcome for a CAP accepted in queued mode."""
+    relay_queue = request.app.state.relay_queue
+    if relay_queue is None:
+        raise HTTPException(status_code=404, detail="Relay queue disabled (RELAY_MODE=sync).")
+    status = relay_queue.status(trace_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired trace_id.")
+    return {"trace_id": trace_id, **status}
+
 # ----------------------------------------------------
 # Error handler
 # ----------------------------------------------------
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return {
+    content = {
         "error": True,
         "code": exc.status_code,
         "message": exc.detail,
-        "trace_id": str(uuid.uuid4())
+        "trace_id": getattr(request.state, "trace_id", None) or str(uuid.uuid4())
     }
+    headers = exc.headers
+    timing = getattr(request.state, "timing", None)
+    if timing is not None:
+        content["timing"] = timing
+        headers = {**(headers or {}), "Server-Timing": server_timing(timing)}
+    return CodecJSONResponse(status_code=exc.status_code, headers=headers, content=content)
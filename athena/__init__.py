@@ -0,0 +1,4 @@
+"""
+Athena CAP Bridge runtime components.
+Shared by app.py and the scripts/ tooling.
+"""
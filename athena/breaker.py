@@ -0,0 +1,171 @@
+"""
+Athena relay circuit breaker and adaptive timeout.
+The breaker fails fast while the bridge is down or slow; the timeout follows
+the observed p99 bridge latency instead of a fixed 10 s. State transitions and
+short-circuited calls are also exported to Prometheus.
+"""
+
+import os, time
+from collections import deque
+from dataclasses import dataclass
+
+from athena.metrics import RELAY_BREAKER_TRANSITIONS, RELAY_SHORT_CIRCUITED
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the bridge while the breaker is open."""
+
+
+# --- Adaptive timeout -------------------------------------------------------
+class AdaptiveTimeout:
+    """Timeout = clamp(p99 of recent calls × multiplier, min, max).
+    Uses max until min_samples latencies have been seen. A call that timed out
+    counts as a sample at the timeout it had, so a bridge that slows down pushes
+    the timeout back up instead of failing every call at the old one."""
+
+    def __init__(self, min_s: float = 0.5, max_s: float = 10.0, multiplier: float = 3.0,
+                 window: int = 200, min_samples: int = 20):
+        self.min_s, self.max_s, self.multiplier = min_s, max_s, multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._p99 = None
+        self._since_sort = 0
+
+    def observe(self, latency_s: float, force: bool = False):
+        self._samples.append(latency_s)
+        self._since_sort += 1
+        if self._since_sort >= 10 or self._p99 is None or force:
+            self._since_sort = 0
+            if len(self._samples) >= self.min_samples:
+                ordered = sorted(self._samples)
+                self._p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def observe_timeout(self, timeout_s: float):
+        self.observe(timeout_s, force=True)  # react to the very first timeout
+
+    @property
+    def p99_s(self):
+        return self._p99
+
+    def current(self) -> float:
+        if self._p99 is None:
+            return self.max_s
+        return min(self.max_s, max(self.min_s, self._p99 * self.multiplier))
+
+
+# --- Circuit breaker --------------------------------------------------------
+@dataclass
+class BreakerConfig:
+    failure_rate: float = 0.5    # open when this share of recent calls failed
+    slow_call_s: float = 2.0     # a call slower than this counts as slow
+    slow_rate: float = 0.8       # open when this share of recent calls was slow
+    min_calls: int = 20          # don't judge on fewer calls than this
+    window_s: float = 30.0       # sliding window for the rates
+    open_s: float = 15.0         # how long to fail fast before probing
+    half_open_probes: int = 3    # trial calls allowed while half-open
+
+    @classmethod
+    def from_env(cls) -> "BreakerConfig":
+        return cls(
+            failure_rate=float(os.getenv("RELAY_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_s=float(os.getenv("RELAY_BREAKER_SLOW_S", "2")),
+            slow_rate=float(os.getenv("RELAY_BREAKER_SLOW_RATE", "0.8")),
+            min_calls=int(os.getenv("RELAY_BREAKER_MIN_CALLS", "20")),
+            window_s=float(os.getenv("RELAY_BREAKER_WINDOW_S", "30")),
+            open_s=float(os.getenv("RELAY_BREAKER_OPEN_S", "15")),
+            half_open_probes=int(os.getenv("RELAY_BREAKER_PROBES", "3")),
+        )
+
+
+class CircuitBreaker:
+    """Closed → open on failure or slow-call rate; open → half-open after open_s;
+    half-open → closed when every probe succeeds, back to open on any failure."""
+
+    def __init__(self, config: BreakerConfig = None, clock=time.monotonic):
+        self.config = config or BreakerConfig()
+        self._clock = clock
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, failed, slow)
+        self._failed = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_ok = 0
+        self.short_circuited = 0
+        self.transitions = {}
+
+    def _transition(self, state: str):
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        RELAY_BREAKER_TRANSITIONS.labels(self.state, state).inc()
+        self.state = state
+        self._calls.clear()
+        self._failed = self._slow = 0
+        self._probes_started = self._probes_ok = 0
+        if state == OPEN:
+            self._opened_at = self._clock()
+
+    def _expire(self, now: float):
+        horizon = now - self.config.window_s
+        while self._calls and self._calls[0][0] < horizon:
+            _, failed, slow = self._calls.popleft()
+            self._failed -= failed
+            self._slow -= slow
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if self._clock() - self._opened_at < self.config.open_s:
+                self._short_circuit()
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes_started >= self.config.half_open_probes:
+                self._short_circuit()
+                return False
+            self._probes_started += 1
+        return True
+
+    def _short_circuit(self):
+        self.short_circuited += 1
+        RELAY_SHORT_CIRCUITED.inc()
+
+    def abandon(self):
+        """An allowed call ended without an outcome (cancelled): free its probe slot."""
+        if self.state == HALF_OPEN and self._probes_started > self._probes_ok:
+            self._probes_started -= 1
+
+    def record(self, ok: bool, latency_s: float):
+        c = self.config
+        if self.state == HALF_OPEN:
+            if not ok:
+                self._transition(OPEN)
+                return
+            self._probes_ok += 1
+            if self._probes_ok >= c.half_open_probes:
+                self._transition(CLOSED)
+            return
+        if self.state == OPEN:
+            return
+
+        now = self._clock()
+        slow = latency_s >= c.slow_call_s
+        self._calls.append((now, not ok, slow))
+        self._failed += not ok
+        self._slow += slow
+        self._expire(now)
+        n = len(self._calls)
+        if n >= c.min_calls and (self._failed / n >= c.failure_rate or self._slow / n >= c.slow_rate):
+            self._transition(OPEN)
+
+    def stats(self) -> dict:
+        n = len(self._calls)
+        return {
+            "state": self.state,
+            "failure_rate": round(self._failed / n, 4) if n else 0.0,
+            "slow_rate": round(self._slow / n, 4) if n else 0.0,
+            "window_calls": n,
+            "short_circuited": self.short_circuited,
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,152 @@
+"""
+Athena JSON codec.
+One place for JSON decode/encode on the hot path: orjson, else msgspec, else the
+stdlib, picked at import (ATHENA_JSON_CODEC=orjson|msgspec|json forces one).
+The fast backends accept strict RFC 8259 only (no NaN, BOM or lone surrogates).
+
+canonical() is the same bytes on every backend (sorted keys, compact, UTF-8,
+floats as Python's repr), so anything hashed or signed downstream never depends
+on which library happens to be installed.
+
+CAP bodies may also arrive as MessagePack or CBOR (decode_body/encode_body),
+when msgpack / cbor2 are installed; decoded values must stay inside the JSON
+data model so they validate and transcode exactly like JSON.
+"""
+
+import json, math, os
+from typing import Any, Callable, Tuple
+
+
+def _stdlib() -> Tuple[Callable[[Any], Any], Callable[[Any], bytes]]:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return json.loads, dumps
+
+
+def _orjson():
+    import orjson
+    return orjson.loads, orjson.dumps
+
+
+def _msgspec():
+    import msgspec
+    return msgspec.json.decode, msgspec.json.Encoder().encode
+
+
+_BACKENDS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+
+def _select(preferred: str):
+    order = [preferred] if preferred in _BACKENDS else ["orjson", "msgspec", "json"]
+    for name in order:
+        try:
+            return (name, *_BACKENDS[name]())
+        except ImportError:
+            continue
+    return ("json", *_stdlib())
+
+
+NAME, loads, dumps = _select(os.getenv("ATHENA_JSON_CODEC", "auto").lower())
+
+
+def canonical(obj) -> bytes:
+    """Deterministic encoding for bytes that get hashed, signed or compared."""
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, sort_keys=True,
+                      separators=(",", ":")).encode("utf-8")
+
+
+# --- CAP body media types ---------------------------------------------------
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+_ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+def media_type(content_type: str) -> str:
+    """Normalised CAP media type; anything that is not MessagePack or CBOR is JSON."""
+    media = (content_type or "").split(";", 1)[0].strip().lower()
+    media = _ALIASES.get(media, media)
+    return media if media in (MSGPACK, CBOR) else JSON
+
+
+def _msgpack_codec():
+    import msgpack
+    return (lambda body: msgpack.unpackb(body, raw=False, strict_map_key=True),
+            lambda obj: msgpack.packb(obj, use_bin_type=True))
+
+
+def _cbor_codec():
+    import cbor2
+    return cbor2.loads, cbor2.dumps
+
+
+_BINARY = {MSGPACK: (_msgpack_codec, "msgpack"), CBOR: (_cbor_codec, "cbor2")}
+_binary_codecs = {}
+
+
+def _binary(media: str):
+    codec = _binary_codecs.get(media)
+    if codec is None:
+        load, package = _BINARY[media]
+        try:
+            codec = _binary_codecs[media] = load()
+        except ImportError:
+            raise UnsupportedMediaType(f"{media} bodies need the {package} package, which is not installed") from None
+    return codec
+
+
+def available(media: str) -> bool:
+    if media == JSON:
+        return True
+    try:
+        _binary(media)
+    except UnsupportedMediaType:
+        return False
+    return True
+
+
+_SCALARS = frozenset((str, int, bool, type(None)))
+
+
+def _json_data_model(obj):
+    """Reject what JSON cannot carry (bytes, tags, non-str keys, NaN) so binary CAPs
+    validate and transcode exactly like their JSON form."""
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        kind = type(node)
+        if kind is dict:
+            for key, value in node.items():
+                if type(key) is not str:
+                    raise ValueError(f"map key {key!r} is not a string")
+                if type(value) not in _SCALARS:
+                    stack.append(value)
+        elif kind is list:
+            stack.extend(v for v in node if type(v) not in _SCALARS)
+        elif kind is float:
+            if not math.isfinite(node):
+                raise ValueError(f"{node!r} has no JSON representation")
+        elif kind not in _SCALARS:
+            raise ValueError(f"{kind.__name__} value has no JSON representation")
+    return obj
+
+
+def decode_body(body: bytes, media: str):
+    if media == JSON:
+        return loads(body)
+    decode = _binary(media)[0]
+    try:
+        obj = decode(body)
+    except Exception as e:
+        raise ValueError(f"undecodable {media} body ({type(e).__name__}: {e})") from None
+    return _json_data_model(obj)
+
+
+def encode_body(obj, media: str) -> bytes:
+    if media == JSON:
+        return dumps(obj)
+    return _binary(media)[1](obj)
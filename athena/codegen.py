@@ -0,0 +1,312 @@
+"""
+Athena CAP schema compiler.
+Turns ATHENA_CAP_SCHEMA_v3_5.json into straight-line Python validation code,
+cached on disk under the schema SHA256 published in the integrity manifest.
+
+Only the keywords the CAP schema actually uses are supported; anything else
+raises NotImplementedError at generation time so the fast path can never
+silently disagree with jsonschema. The generated validator stops at the first
+error (jsonschema reports its best match), so verdicts agree but messages for
+multi-error payloads can differ.
+"""
+
+import importlib.util, json, logging, os, time
+from pathlib import Path
+from typing import Optional
+
+from jsonschema.exceptions import ValidationError
+
+from athena.validation import TimedValidator, sha256_bytes
+
+GENERATOR_VERSION = 1
+SCHEMA_NAME = "ATHENA_CAP_SCHEMA_v3_5.json"
+MANIFEST_NAME = "FalconForge_Integrity_Manifest_v3_5.json"
+
+_ANNOTATIONS = {"$schema", "$id", "title", "description", "default", "canonical_version"}
+_SUPPORTED = _ANNOTATIONS | {
+    "type", "properties", "required", "additionalProperties", "items",
+    "enum", "pattern", "format", "minimum",
+}
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": "((isinstance({v}, int) and not isinstance({v}, bool)) or (isinstance({v}, float) and {v}.is_integer()))",
+}
+
+# Which instance types a keyword applies to (jsonschema ignores it otherwise).
+_KEYWORD_TYPES = {
+    "properties": "object", "required": "object", "additionalProperties": "object",
+    "items": "array", "pattern": "string", "format": "string", "minimum": "number",
+}
+
+
+# --- Generator --------------------------------------------------------------
+class _Emitter:
+    def __init__(self):
+        self.lines = []
+        self.constants = []
+        self._n = 0
+
+    def name(self, prefix: str) -> str:
+        self._n += 1
+        return f"{prefix}{self._n}"
+
+    def const(self, prefix: str, expr: str) -> str:
+        name = self.name(prefix)
+        self.constants.append(f"{name} = {expr}")
+        return name
+
+    def emit(self, depth: int, line: str):
+        self.lines.append("    " * depth + line)
+
+
+def _path(parts) -> str:
+    return "(" + "".join(f"{p}, " for p in parts) + ")"
+
+
+def _emit_fail(em: _Emitter, depth: int, v: str, suffix: str, path: list):
+    """Emit a failure whose message is repr(instance) + suffix, as jsonschema words it."""
+    em.emit(depth, f"_fail(repr({v}) + {suffix!r}, {_path(path)})")
+
+
+def _applies(kind: str, declared) -> Optional[bool]:
+    """True if the declared type guarantees the keyword applies, False if it never does, None if unknown."""
+    if not isinstance(declared, str):
+        return None
+    if kind == "number":
+        return declared in ("number", "integer")
+    return declared == kind
+
+
+def _compile(em: _Emitter, schema: dict, v: str, path: list, depth: int):
+    unsupported = set(schema) - _SUPPORTED
+    if unsupported:
+        raise NotImplementedError(f"Unsupported schema keyword(s): {sorted(unsupported)}")
+
+    declared = schema.get("type")
+    if declared is not None:
+        types = [declared] if isinstance(declared, str) else list(declared)
+        cond = " or ".join(_TYPE_CHECKS[t].format(v=v) for t in types)
+        label = repr(declared) if isinstance(declared, str) else repr(types)
+        em.emit(depth, f"if not ({cond}):")
+        _emit_fail(em, depth + 1, v, f" is not of type {label}", path)
+
+    def guarded(keyword: str) -> Optional[int]:
+        """Emit a type guard if needed; return the depth to emit at, or None to skip."""
+        kind = _KEYWORD_TYPES[keyword]
+        applies = _applies(kind, declared)
+        if applies is False:
+            return None
+        if applies is None:
+            em.emit(depth, f"if {_TYPE_CHECKS[kind].format(v=v)}:")
+            return depth + 1
+        return depth
+
+    if "enum" in schema:
+        values = schema["enum"]
+        if declared == "string" and all(isinstance(e, str) for e in values):
+            enum = em.const("_E", f"frozenset({sorted(values)!r})")
+            em.emit(depth, f"if {v} not in {enum}:")
+        else:
+            enum = em.const("_E", repr(tuple(values)))
+            em.emit(depth, f"if not any(_json_equal({v}, e) for e in {enum}):")
+        _emit_fail(em, depth + 1, v, f" is not one of {values!r}", path)
+
+    if "pattern" in schema and (d := guarded("pattern")) is not None:
+        pattern = em.const("_P", f"re.compile({schema['pattern']!r})")
+        em.emit(d, f"if {pattern}.search({v}) is None:")
+        _emit_fail(em, d + 1, v, f" does not match {schema['pattern']!r}", path)
+
+    if "format" in schema and (d := guarded("format")) is not None:
+        fmt = schema["format"]
+        em.emit(d, f"if not _FORMATS.conforms({v}, {fmt!r}):")
+        _emit_fail(em, d + 1, v, f" is not a {fmt!r}", path)
+
+    if "minimum" in schema and (d := guarded("minimum")) is not None:
+        minimum = schema["minimum"]
+        em.emit(d, f"if {v} < {minimum!r}:")
+        _emit_fail(em, d + 1, v, f" is less than the minimum of {minimum!r}", path)
+
+    if any(k in schema for k in ("required", "properties", "additionalProperties")):
+        d = guarded("properties")
+        if d is not None:
+            _compile_object(em, schema, v, path, d)
+
+    if "items" in schema and (d := guarded("items")) is not None:
+        i, item = em.name("i"), em.name("v")
+        em.emit(d, f"for {i}, {item} in enumerate({v}):")
+        before = len(em.lines)
+        _compile(em, schema["items"], item, path + [i], d + 1)
+        if len(em.lines) == before:
+            em.lines.pop()
+
+
+def _compile_object(em: _Emitter, schema: dict, v: str, path: list, depth: int):
+    required = schema.get("required", [])
+    properties = schema.get("properties", {})
+    additional = schema.get("additionalProperties", True)
+
+    for key in required:
+        em.emit(depth, f"if {key!r} not in {v}:")
+        em.emit(depth + 1, f"_fail({(repr(key) + ' is a required property')!r}, {_path(path)})")
+
+    if additional is False:
+        allowed = em.const("_K", f"frozenset({sorted(properties)!r})")
+        em.emit(depth, f"if not {allowed}.issuperset({v}):")
+        em.emit(depth + 1, f"_fail_additional({v}, {allowed}, {_path(path)})")
+    elif additional is not True:
+        raise NotImplementedError("Only boolean additionalProperties is supported")
+
+    for key, subschema in properties.items():
+        child = em.name("v")
+        if key in required:
+            em.emit(depth, f"{child} = {v}[{key!r}]")
+            _compile(em, subschema, child, path + [repr(key)], depth)
+        else:
+            em.emit(depth, f"{child} = {v}.get({key!r}, _MISSING)")
+            em.emit(depth, f"if {child} is not _MISSING:")
+            before = len(em.lines)
+            _compile(em, subschema, child, path + [repr(key)], depth + 1)
+            if len(em.lines) == before:
+                del em.lines[-2:]
+
+
+_PRELUDE = '''\
+import re
+from collections import deque
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import ValidationError
+
+_MISSING = object()
+_FORMATS = Draft202012Validator.FORMAT_CHECKER
+
+
+def _fail(message, path):
+    raise ValidationError(message, path=deque(path))
+
+
+def _fail_additional(instance, allowed, path):
+    extras = ", ".join(repr(k) for k in instance if k not in allowed)
+    verb = "were" if sum(1 for k in instance if k not in allowed) > 1 else "was"
+    _fail(f"Additional properties are not allowed ({extras} {verb} unexpected)", path)
+
+
+def _json_equal(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+'''
+
+
+def generate_source(schema: dict, schema_hash: str) -> str:
+    em = _Emitter()
+    _compile(em, schema, "v0", [], 1)
+    return "\n".join([
+        f"# Generated by athena.codegen (v{GENERATOR_VERSION}) from {SCHEMA_NAME} — do not edit.",
+        _PRELUDE,
+        f"SCHEMA_SHA256 = {schema_hash!r}",
+        f"GENERATOR_VERSION = {GENERATOR_VERSION}",
+        *em.constants,
+        "",
+        "",
+        "def validate(v0):",
+        *em.lines,
+        "",
+    ])
+
+
+# --- Compiled validator -----------------------------------------------------
+class CompiledCAPValidator(TimedValidator):
+    """Same interface as validation.CAPValidator, backed by generated code."""
+
+    kind = "compiled"
+
+    def __init__(self, schema: dict, schema_hash: str, module, build_ms: float, source_path: Path):
+        super().__init__(schema, schema_hash, build_ms)
+        self._validate = module.validate
+        self.source_path = source_path
+
+    def validate(self, instance):
+        t0 = time.perf_counter()
+        try:
+            self._validate(instance)
+        finally:
+            self._record((time.perf_counter() - t0) * 1000)
+
+    def is_valid(self, instance) -> bool:
+        try:
+            self._validate(instance)
+            return True
+        except ValidationError:
+            return False
+
+    def stats(self) -> dict:
+        return {**super().stats(), "source": self.source_path.name}
+
+
+def manifest_schema_hash(manifest_path: Path, name: str = SCHEMA_NAME) -> str:
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    module = next(m for m in manifest["modules"] if m["name"] == name)
+    return module["sha256"].split(":")[-1].lower()
+
+
+def default_cache_dir(base_dir: Path) -> Path:
+    return Path(os.getenv("ATHENA_CACHE_DIR", str(base_dir / ".cache" / "athena")))
+
+
+def load_compiled_validator(schema_path: Path, manifest_path: Path,
+                            cache_dir: Path) -> Optional[CompiledCAPValidator]:
+    """Return the compiled validator for the schema, generating it on a cache miss.
+    Returns None if the schema on disk does not match the manifest hash."""
+    t0 = time.perf_counter()
+    raw = Path(schema_path).read_bytes()
+    expected = manifest_schema_hash(manifest_path)
+    actual = sha256_bytes(raw)
+    if actual != expected:
+        logging.warning(f"Compiled validator disabled: schema hash {actual[:12]} != manifest {expected[:12]}")
+        return None
+
+    schema = json.loads(raw)
+    source_path = Path(cache_dir) / f"cap_validator_{expected}_g{GENERATOR_VERSION}.py"
+    if not source_path.exists():
+        source_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = source_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(generate_source(schema, expected), encoding="utf-8")
+        os.replace(tmp, source_path)
+        logging.info(f"Compiled validator generated → {source_path}")
+
+    spec = importlib.util.spec_from_file_location(f"athena_cap_validator_{expected[:12]}", source_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if module.SCHEMA_SHA256 != expected:
+        raise ValueError(f"Cached validator {source_path} does not match schema hash {expected}")
+    return CompiledCAPValidator(schema, expected, module, (time.perf_counter() - t0) * 1000, source_path)
+
+
+def load_preferred_validator(base_dir: Path, reference: TimedValidator) -> TimedValidator:
+    """Prefer the code-generated validator; fall back to the cached jsonschema one.
+    ATHENA_SINGLE_PASS_VALIDATOR=1 selects the strict pydantic model tree instead."""
+    if os.getenv("ATHENA_SINGLE_PASS_VALIDATOR", "0") == "1":
+        try:
+            from athena.schema_models import ModelCAPValidator  # pydantic: not needed otherwise
+            return ModelCAPValidator(reference.schema, reference.schema_hash)
+        except Exception as e:
+            logging.warning(f"Single-pass validator unavailable, using the two-step path: {e}")
+    if os.getenv("ATHENA_FAST_VALIDATOR", "1") == "0":
+        return reference
+    try:
+        compiled = load_compiled_validator(
+            base_dir / "schemas" / SCHEMA_NAME,
+            base_dir / "schemas" / MANIFEST_NAME,
+            default_cache_dir(base_dir),
+        )
+    except Exception as e:
+        logging.warning(f"Compiled validator unavailable, using jsonschema: {e}")
+        return reference
+    return compiled or reference
@@ -0,0 +1,202 @@
+"""
+Athena HTTP body compression.
+Incremental Content-Encoding decoders (gzip, deflate, and zstd when the
+zstandard package is installed) that hand out decoded output in bounded pieces,
+so a small compressed body cannot expand unchecked, and one-shot encoders for
+relay bodies. Ratio and CPU time of both directions go to Prometheus.
+"""
+
+import gzip, time, zlib
+from typing import AsyncIterator, Iterator, List, Optional
+
+from athena.metrics import COMPRESSION_RATIO, COMPRESSION_SECONDS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PIECE_BYTES = 64 << 10  # decoded bytes per zlib call
+ZSTD_SLICE = 512        # compressed bytes per zstd call (zstd has no max_length)
+PREFERENCE = ("zstd", "gzip", "deflate")
+_ALIASES = {"x-gzip": "gzip"}
+
+
+class UnsupportedEncoding(ValueError):
+    pass
+
+
+class DecodedTooLarge(Exception):
+    """The decoded body exceeded the configured maximum."""
+
+    def __init__(self, max_bytes: int, wire_bytes: int):
+        super().__init__(f"Decompressed request body exceeds {max_bytes} bytes.")
+        self.max_bytes, self.wire_bytes = max_bytes, wire_bytes
+
+
+def supported() -> tuple:
+    return tuple(e for e in PREFERENCE if e != "zstd" or zstandard is not None)
+
+
+def parse_content_encoding(header: Optional[str]) -> Optional[str]:
+    """The single supported coding named by a Content-Encoding header, or None for
+    identity; stacked or unknown codings raise UnsupportedEncoding."""
+    codings = [_ALIASES.get(c, c) for c in (p.strip().lower() for p in (header or "").split(","))
+               if c and c != "identity"]
+    if not codings:
+        return None
+    if len(codings) > 1 or codings[0] not in supported():
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding {header!r}; accepted: {', '.join(supported())}.")
+    return codings[0]
+
+
+def parse_accept_encoding(header: Optional[str]) -> tuple:
+    """Supported codings a peer accepts (q > 0), in our preference order."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().lower().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(_ALIASES.get(coding.strip(), coding.strip()))
+    return tuple(e for e in supported() if e in accepted)
+
+
+# --- Decoding ---------------------------------------------------------------
+class Decoder:
+    """Decodes one body chunk by chunk. feed() yields decoded pieces and raises
+    DecodedTooLarge once more than max_bytes have been produced; keep_wire also
+    retains the encoded bytes (to relay them as received)."""
+
+    def __init__(self, encoding: str, max_bytes: Optional[int] = None, keep_wire: bool = False,
+                 direction: str = "intake"):
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.direction = direction
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.seconds = 0.0
+        self._wire: Optional[List[bytes]] = [] if keep_wire else None
+        self._raw_deflate = False
+        self._d = self._new()
+
+    def _new(self):
+        if self.encoding == "zstd":
+            return zstandard.ZstdDecompressor().decompressobj()
+        if self.encoding == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return zlib.decompressobj(-zlib.MAX_WBITS if self._raw_deflate else zlib.MAX_WBITS)
+
+    @property
+    def wire(self) -> bytes:
+        return b"".join(self._wire)
+
+    def _pieces(self, data: bytes) -> Iterator[bytes]:
+        if self.encoding == "zstd":
+            for i in range(0, len(data), ZSTD_SLICE):
+                yield self._d.decompress(data[i:i + ZSTD_SLICE])
+            return
+        while data:
+            out = self._d.decompress(data, PIECE_BYTES)
+            data = self._d.unconsumed_tail
+            yield out
+            if self._d.eof and self._d.unused_data and self.encoding == "gzip":
+                data = self._d.unused_data  # next gzip member
+                self._d = self._new()
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        first = self.wire_bytes == 0
+        self.wire_bytes += len(chunk)
+        if self._wire is not None:
+            self._wire.append(chunk)
+        pieces = self._pieces(chunk)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                piece = next(pieces)
+            except StopIteration:
+                return
+            except Exception as e:
+                if first and self.encoding == "deflate" and not self._raw_deflate and not self.decoded_bytes:
+                    # "deflate" is zlib-wrapped (RFC 9110), but raw deflate is common in the wild
+                    self._raw_deflate = True
+                    self._d = self._new()
+                    self.wire_bytes -= len(chunk)
+                    if self._wire is not None:
+                        self._wire.pop()
+                    yield from self.feed(chunk)
+                    return
+                raise ValueError(f"Invalid {self.encoding} body: {e}") from None
+            finally:
+                self.seconds += time.perf_counter() - t0
+            if piece:
+                self.decoded_bytes += len(piece)
+                if self.max_bytes is not None and self.decoded_bytes > self.max_bytes:
+                    raise DecodedTooLarge(self.max_bytes, self.wire_bytes)
+                yield piece
+
+    def finish(self):
+        """Raise ValueError if the body ended mid-stream; record ratio and CPU time."""
+        if not self._d.eof:
+            raise ValueError(f"Truncated {self.encoding} body.")
+        if self.wire_bytes:
+            COMPRESSION_RATIO.labels(self.direction, self.encoding).observe(self.decoded_bytes / self.wire_bytes)
+        COMPRESSION_SECONDS.labels(self.direction, self.encoding).observe(self.seconds)
+
+
+async def decode_stream(chunks: AsyncIterator[bytes], decoder: Decoder) -> AsyncIterator[bytes]:
+    """Decoded pieces of a streamed body (e.g. /cap/stream), as they arrive."""
+    async for chunk in chunks:
+        for piece in decoder.feed(chunk):
+            yield piece
+    decoder.finish()
+
+
+def decode(body: bytes, encoding: str, direction: str = "relay_decode") -> bytes:
+    decoder = Decoder(encoding, direction=direction)
+    out = b"".join(decoder.feed(body))
+    decoder.finish()
+    return out
+
+
+# --- Encoding ---------------------------------------------------------------
+def encode(body: bytes, encoding: str, level: Optional[int] = None, direction: str = "relay") -> bytes:
+    """body in encoding; level None is the coding's own default (zstd 3, gzip/deflate 6)."""
+    t0 = time.perf_counter()
+    if encoding == "zstd":
+        out = zstandard.ZstdCompressor(level=3 if level is None else level).compress(body)
+    elif encoding == "gzip":
+        out = gzip.compress(body, compresslevel=6 if level is None else level, mtime=0)
+    elif encoding == "deflate":
+        out = zlib.compress(body, 6 if level is None else level)
+    else:
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding {encoding!r}")
+    COMPRESSION_SECONDS.labels(direction, encoding).observe(time.perf_counter() - t0)
+    if out:
+        COMPRESSION_RATIO.labels(direction, encoding).observe(len(body) / len(out))
+    return out
+
+
+# --- Stats ------------------------------------------------------------------
+class CompressionStats:
+    """Per-encoding totals for /stats (the Prometheus histograms carry distributions)."""
+
+    def __init__(self):
+        self.by_encoding = {}
+
+    def record(self, encoding: str, wire_bytes: int, decoded_bytes: int, seconds: float):
+        entry = self.by_encoding.setdefault(encoding, {"bodies": 0, "wire_bytes": 0, "decoded_bytes": 0,
+                                                       "seconds": 0.0})
+        entry["bodies"] += 1
+        entry["wire_bytes"] += wire_bytes
+        entry["decoded_bytes"] += decoded_bytes
+        entry["seconds"] += seconds
+
+    def stats(self) -> dict:
+        return {encoding: {**e, "seconds": round(e["seconds"], 6),
+                           "ratio": round(e["decoded_bytes"] / e["wire_bytes"], 2) if e["wire_bytes"] else 0.0}
+                for encoding, e in self.by_encoding.items()}
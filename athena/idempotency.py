@@ -0,0 +1,153 @@
+"""
+Athena idempotent intake cache.
+Producers retry on timeouts; a retry with the same body and signature gets the
+original /cap result back without parse, validation or relay, and
+identical submissions that arrive together share one computation
+(singleflight). If the request computing it is cancelled (its client went
+away), the ones waiting on it take over instead of failing with it.
+
+Entries are keyed by (cap_id, SHA256 of the body). The cap_id is pulled from
+the raw bytes with a regex rather than a parse; it only namespaces the key, the
+body hash is what makes it content-addressed. A hit also requires the same
+verified identity as the first time: the X-Athena-Signature for plain signed
+requests, the signing key for replay-protected (v2) ones, whose retries carry
+a fresh nonce and therefore a fresh signature.
+"""
+
+import asyncio, hashlib, hmac, json, os, re, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+_CAP_ID = re.compile(rb'"cap_id"\s*:\s*"([^"\\]{1,128})"')
+_ENTRY_OVERHEAD = 256  # dict slot, tuple, floats, key strings (approximate)
+
+Key = Tuple[str, str]
+Outcome = Tuple[int, dict]
+Compute = Callable[[], Awaitable[Tuple[int, dict, bool]]]
+
+
+def idempotency_key(body: bytes) -> Key:
+    match = _CAP_ID.search(body)
+    cap_id = match.group(1).decode("utf-8", "replace") if match else ""
+    return cap_id, hashlib.sha256(body).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("signature", "status", "content", "expires_at", "size")
+
+    def __init__(self, signature, status, content, expires_at, size):
+        self.signature, self.status, self.content = signature, status, content
+        self.expires_at, self.size = expires_at, size
+
+
+class IdempotencyCache:
+    """Bounded LRU + TTL result cache with singleflight coalescing."""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 32 << 20, ttl_s: float = 600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._inflight = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.evictions = {"lru": 0, "ttl": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["IdempotencyCache"]:
+        max_entries = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+        if max_entries <= 0:
+            return None
+        return cls(
+            max_entries=max_entries,
+            max_bytes=int(os.getenv("IDEMPOTENCY_CACHE_BYTES", str(32 << 20))),
+            ttl_s=float(os.getenv("IDEMPOTENCY_TTL_S", "600")),
+        )
+
+    # --- Entries ------------------------------------------------------------
+    def _get(self, key: Key, signature: Optional[str]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(key, "ttl")
+            return None
+        if not signature or not hmac.compare_digest(entry.signature, signature):
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: Key, signature: str, status: int, content: dict):
+        size = _ENTRY_OVERHEAD + len(signature) + len(json.dumps(content, default=str))
+        if key in self._entries:
+            self._drop(key, None)
+        self._entries[key] = _Entry(signature, status, content, time.monotonic() + self.ttl_s, size)
+        self.bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)), "lru")
+
+    def _drop(self, key: Key, reason: Optional[str]):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        if reason:
+            self.evictions[reason] += 1
+
+    # --- Singleflight -------------------------------------------------------
+    async def run(self, key: Key, signature: Optional[str], compute: Compute) -> Tuple[int, dict, bool]:
+        """Return (status, content, replayed). compute() returns (status, content, cacheable)
+        and only runs when there is neither a cached result nor an identical request in flight."""
+        flight = (key, signature)
+        while True:
+            entry = self._get(key, signature)
+            if entry is not None:
+                self.hits += 1
+                return entry.status, entry.content, True
+            future = self._inflight.get(flight)
+            if future is None:
+                break
+            outcome = await asyncio.shield(future)
+            if outcome is not None:
+                self.coalesced += 1
+                status, content = outcome
+                return status, content, True
+            # None: the leader was cancelled; look again, and compute it ourselves if nobody is
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[flight] = future
+        try:
+            status, content, cacheable = await compute()
+        except asyncio.CancelledError:
+            self.abandoned += 1
+            future.set_result(None)  # followers retry rather than inherit the cancellation
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(flight, None)
+        if cacheable and signature:
+            self._put(key, signature, status, content)
+        future.set_result((status, content))
+        return status, content, False
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": dict(self.evictions),
+            "inflight": len(self._inflight),
+        }
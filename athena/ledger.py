@@ -0,0 +1,104 @@
+"""
+Athena CAP ledger.
+Append-only local record of every accepted CAP (answered 200, or 202 once
+queued), on top of SegmentLog: one writer task, group commit, size- and
+age-based segment rollover. Intake appends after the relay step, so a CAP
+refused for lack of queue room is recorded only when its retry is accepted.
+/cap only enqueues the record (write-behind) unless LEDGER_SYNC=1 asks it to wait for
+the commit; a full writer queue back-pressures intake rather than losing CAPs.
+
+Record: b"C" + trace_id (36 ASCII) + u64 received_at (unix ms) + u8 media type
+length + media type + CAP body (decoded, as validated).
+"""
+
+import os, struct, time
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from athena import codec
+from athena.segment_log import FsyncPolicy, SegmentLog
+
+CAP = b"C"
+TRACE_ID_LEN = 36
+_HEAD = struct.Struct(f"<c{TRACE_ID_LEN}sQB")
+
+
+class LedgerEntry(NamedTuple):
+    trace_id: str
+    received_at_ms: int
+    content_type: str
+    body: bytes
+
+
+class CAPLedger:
+    """Validated CAPs, in the order they were accepted."""
+
+    def __init__(self, log: SegmentLog, sync: bool = False):
+        self.log = log
+        self.sync = sync
+        self.appended = 0
+        self.backpressured = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["CAPLedger"]:
+        directory = os.getenv("LEDGER_DIR", "")
+        if not directory:
+            return None
+        return cls(SegmentLog(
+            Path(directory), "ledger",
+            segment_bytes=int(os.getenv("LEDGER_SEGMENT_BYTES", str(64 << 20))),
+            # write-behind records arrive in bursts; bigger groups keep the writer ahead of intake
+            policy=FsyncPolicy.from_env("LEDGER", batch_size=256, interval_ms=10),
+            queue_size=int(os.getenv("LEDGER_QUEUE_SIZE", "10000")),
+            roll_after_s=float(os.getenv("LEDGER_ROLL_AFTER_S", "0")),
+        ), sync=os.getenv("LEDGER_SYNC", "0") == "1")
+
+    # --- Lifecycle ----------------------------------------------------------
+    async def open(self):
+        await self.log.open()
+
+    async def close(self):
+        await self.log.close()
+
+    # --- Records ------------------------------------------------------------
+    @staticmethod
+    def encode(trace_id: str, body: bytes, content_type: str = codec.JSON,
+               received_at_ms: Optional[int] = None) -> bytes:
+        media = content_type.encode("ascii")
+        if received_at_ms is None:
+            received_at_ms = time.time_ns() // 1_000_000
+        return b"".join((_HEAD.pack(CAP, trace_id.encode("ascii"), received_at_ms, len(media)), media, body))
+
+    @staticmethod
+    def decode(record: bytes) -> LedgerEntry:
+        kind, trace_id, received_at_ms, media_len = _HEAD.unpack_from(record)
+        if kind != CAP:
+            raise ValueError(f"not a ledger record: {kind!r}")
+        pos = _HEAD.size + media_len
+        return LedgerEntry(trace_id.decode("ascii"), received_at_ms, record[_HEAD.size:pos].decode("ascii"),
+                           record[pos:])
+
+    async def append(self, trace_id: str, body: bytes, content_type: str = codec.JSON):
+        """Record an accepted CAP. Returns once it is queued for the writer (or committed,
+        with sync); waits for queue room when the writer is behind."""
+        record = self.encode(trace_id, body, content_type)
+        self.appended += 1
+        if self.sync:
+            await self.log.append(record)
+        elif not self.log.try_append(record):
+            self.backpressured += 1
+            await self.log.append(record)
+
+    def entries(self) -> Iterator[LedgerEntry]:
+        """Every intact record on disk, oldest first."""
+        for _, record in self.log.scan():
+            yield self.decode(record)
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            **self.log.stats(),
+            "sync": self.sync,
+            "appended": self.appended,
+            "backpressured": self.backpressured,
+        }
@@ -0,0 +1,117 @@
+"""
+Athena /cap load shedding.
+An AIMD concurrency limit: each /cap whose latency (handler time minus any
+synchronous relay round-trip, plus current event-loop lag, i.e. the queue every
+connection waits in) is within the target
+while the limit is in use raises it by one; a slower one cuts it by the backoff
+ratio (at most once per target interval). Requests beyond the limit, or arriving
+after loop lag has stayed above the target for a whole interval (CoDel's standing
+queue), get 503 before their body is read.
+"""
+
+import asyncio, os, time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ShedConfig:
+    target_ms: float = 0.0   # latency target; 0 disables shedding
+    initial_limit: int = 64
+    min_limit: int = 4
+    max_limit: int = 1024
+    backoff: float = 0.9
+    lag_interval_s: float = 0.05   # lag sampling period
+    lag_window_s: float = 0.1      # how long lag must stay above target before shedding on it
+
+    @classmethod
+    def from_env(cls) -> "ShedConfig":
+        return cls(
+            target_ms=float(os.getenv("ATHENA_SHED_TARGET_MS", "0")),
+            initial_limit=int(os.getenv("ATHENA_SHED_INITIAL_LIMIT", "64")),
+            min_limit=int(os.getenv("ATHENA_SHED_MIN_LIMIT", "4")),
+            max_limit=int(os.getenv("ATHENA_SHED_MAX_LIMIT", "1024")),
+            backoff=float(os.getenv("ATHENA_SHED_BACKOFF", "0.9")),
+            lag_interval_s=float(os.getenv("ATHENA_SHED_LAG_INTERVAL_S", "0.05")),
+            lag_window_s=float(os.getenv("ATHENA_SHED_LAG_WINDOW_S", "0.1")),
+        )
+
+
+class LoadShedder:
+    def __init__(self, config: ShedConfig, clock=time.perf_counter):
+        self.config = config
+        self.target_s = config.target_ms / 1000
+        self._clock = clock
+        self.limit = float(config.initial_limit)
+        self.inflight = 0
+        self.loop_lag_s = 0.0
+        self.lag_standing = False
+        self._lag_high_since: Optional[float] = None
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.shed = {"limit": 0, "lag": 0}
+        self.increases = 0
+        self.decreases = 0
+        self._latency_ewma_s = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["LoadShedder"]:
+        config = ShedConfig.from_env()
+        return cls(config) if config.target_ms > 0 else None
+
+    def acquire(self) -> Optional[str]:
+        """Take an in-flight slot; returns None when admitted, else why the request is shed."""
+        if self.lag_standing:
+            self.shed["lag"] += 1
+            return "lag"
+        if self.inflight >= int(self.limit):
+            self.shed["limit"] += 1
+            return "limit"
+        self.inflight += 1
+        self.admitted += 1
+        return None
+
+    def release(self, elapsed: float):
+        """Free the slot taken by acquire() and adjust the limit from the request's local
+        latency (elapsed seconds, excluding the relay)."""
+        now = self._clock()
+        latency = elapsed + self.loop_lag_s
+        self._latency_ewma_s += (latency - self._latency_ewma_s) * 0.1
+        if latency > self.target_s:
+            if now - self._last_decrease >= self.target_s:
+                self.limit = max(self.config.min_limit, self.limit * self.config.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif self.inflight * 2 >= self.limit and self.limit < self.config.max_limit:
+            self.limit = min(self.config.max_limit, self.limit + 1)
+            self.increases += 1
+        self.inflight -= 1
+
+    async def watch_lag(self):
+        """Sample event-loop lag: how late a sleep of lag_interval_s wakes up."""
+        interval = self.config.lag_interval_s
+        while True:
+            t0 = self._clock()
+            await asyncio.sleep(interval)
+            now = self._clock()
+            self.loop_lag_s = max(0.0, now - t0 - interval)
+            if self.loop_lag_s <= self.target_s:
+                self._lag_high_since, self.lag_standing = None, False
+            elif self._lag_high_since is None:
+                self._lag_high_since = now
+            else:
+                self.lag_standing = now - self._lag_high_since >= self.config.lag_window_s
+
+    def stats(self) -> dict:
+        return {
+            "target_ms": self.config.target_ms,
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "loop_lag_ms": round(self.loop_lag_s * 1000, 3),
+            "lag_standing": self.lag_standing,
+            "latency_ewma_ms": round(self._latency_ewma_s * 1000, 3),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
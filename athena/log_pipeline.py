@@ -0,0 +1,138 @@
+"""
+Athena logging pipeline.
+Log calls only enqueue the record; a QueueListener thread formats (text or
+JSON) and writes it, so stdout never blocks the event loop. The queue is
+bounded and drops (and counts) records rather than stall intake, and records
+logged with extra={"sample": True} are kept 1-in-N per level.
+"""
+
+import atexit, datetime, json, logging, os, queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, any extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                  .isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and key != "sample":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps 1 in every_n[level] of the records marked sample=True; others always pass."""
+
+    def __init__(self, every_n: Dict[int, int]):
+        super().__init__()
+        self.every_n = every_n
+        self._seen: Dict[int, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        n = self.every_n.get(record.levelno, 1)
+        if n <= 1 or not getattr(record, "sample", False):
+            return True
+        seen = self._seen.get(record.levelno, 0)
+        self._seen[record.levelno] = seen + 1
+        if seen % n == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Enqueues records unformatted; a full queue drops the record instead of blocking."""
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record  # formatting happens on the listener thread
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    def __init__(self, handler: BoundedQueueHandler, listener: QueueListener, sampler: SamplingFilter, fmt: str):
+        self.handler, self.listener, self.sampler, self.format = handler, listener, sampler, fmt
+        self._running = True
+
+    def stop(self):
+        """Flush what is queued and stop the writer thread (idempotent)."""
+        if self._running:
+            self._running = False
+            try:
+                self.listener.stop()
+            except queue.Full:  # no room for the stop sentinel; the writer thread is a daemon
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "format": self.format,
+            "queue_depth": self.handler.queue.qsize(),
+            "queue_size": self.handler.queue.maxsize,
+            "enqueued": self.handler.enqueued,
+            "dropped": self.handler.dropped,
+            "sampled_out": self.sampler.sampled_out,
+            "sample_every": {logging.getLevelName(level): n for level, n in self.sampler.every_n.items()},
+        }
+
+
+def parse_sampling(spec: str) -> Dict[int, int]:
+    """"INFO=100,DEBUG=1000" -> {logging.INFO: 100, logging.DEBUG: 1000}."""
+    every_n = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        level, _, n = part.partition("=")
+        every_n[logging.getLevelName(level.strip().upper())] = max(1, int(n))
+    return every_n
+
+
+def configure_logging(level: int = logging.INFO) -> Optional[LogPipeline]:
+    """Route the root logger through the queue pipeline. ATHENA_LOG_ASYNC=0 keeps
+    plain synchronous logging (basicConfig) and returns None."""
+    fmt = os.getenv("ATHENA_LOG_FORMAT", "text").lower()
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    if os.getenv("ATHENA_LOG_ASYNC", "1") == "0":
+        logging.basicConfig(format=TEXT_FORMAT, level=level)
+        if fmt == "json":
+            for h in logging.getLogger().handlers:
+                h.setFormatter(formatter)
+        return None
+
+    writer = logging.StreamHandler()
+    writer.setFormatter(formatter)
+    handler = BoundedQueueHandler(int(os.getenv("ATHENA_LOG_QUEUE_SIZE", "10000")))
+    sampler = SamplingFilter(parse_sampling(os.getenv("ATHENA_LOG_SAMPLE", "")))
+    handler.addFilter(sampler)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, BoundedQueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    listener = QueueListener(handler.queue, writer, respect_handler_level=True)
+    listener.start()
+    pipeline = LogPipeline(handler, listener, sampler, fmt)
+    atexit.register(pipeline.stop)
+    return pipeline
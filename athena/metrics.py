@@ -0,0 +1,109 @@
+"""
+Athena Prometheus metrics.
+Per-stage latency histograms, result, shed and early-rejection counters and
+the load-shedding concurrency limit for /cap, relay circuit breaker state, relay
+queue depth, busy workers and time queued, and body compression ratio / CPU
+time. /metrics itself is served by prometheus-fastapi-instrumentator from the
+default registry.
+"""
+
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+STAGES = ("read", "hmac", "decompress", "verify", "parse", "model", "schema", "pool", "relay", "ledger")
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram("athena_cap_stage_seconds", "Time spent in each /cap stage.",
+                          ["stage"], buckets=BUCKETS)
+CAP_RESULTS = Counter("athena_cap_requests_total", "/cap requests by result status, domain and context_mode.",
+                      ["result", "domain", "context_mode"])
+CAP_SHED = Counter("athena_cap_shed_total", "/cap requests shed with 503 before being read, by reason.", ["reason"])
+CAP_REJECTED = Counter("athena_cap_rejected_total", "Requests refused before validation (signature, "
+                       "replay, size, rate limit, ...), by reason.", ["reason"])
+CAP_REJECTED_BYTES = Counter("athena_cap_rejected_bytes_total", "Body bytes read from requests before they were "
+                             "refused, by reason.", ["reason"])
+CAP_REJECTED_SECONDS = Counter("athena_cap_rejected_seconds_total", "Time spent on requests before they were "
+                               "refused, by reason.", ["reason"])
+CAP_CONCURRENCY_LIMIT = Gauge("athena_cap_concurrency_limit", "Current adaptive /cap concurrency limit.")
+CAP_INFLIGHT = Gauge("athena_cap_inflight", "/cap requests currently admitted by the load shedder.")
+RELAY_BREAKER_STATE = Gauge("athena_relay_breaker_state", "1 for the relay circuit breaker's current state.",
+                            ["state"])
+RELAY_BREAKER_TRANSITIONS = Counter("athena_relay_breaker_transitions_total",
+                                    "Relay circuit breaker state changes.", ["from_state", "to_state"])
+RELAY_SHORT_CIRCUITED = Counter("athena_relay_short_circuited_total",
+                                "Relay calls refused by the open (or saturated half-open) breaker.")
+RELAY_TIMEOUT_SECONDS = Gauge("athena_relay_timeout_seconds", "Current adaptive relay timeout.")
+RELAY_QUEUE_DEPTH = Gauge("athena_relay_queue_depth", "CAPs waiting in the relay queue (queued mode).")
+RELAY_WORKERS_BUSY = Gauge("athena_relay_workers_busy", "Relay queue workers currently relaying a CAP.")
+RELAY_QUEUED_SECONDS = Histogram("athena_relay_queued_seconds", "Time a CAP waited in the relay queue for a worker.",
+                                 buckets=BUCKETS)
+COMPRESSION_RATIO = Histogram("athena_compression_ratio", "Decoded / encoded size of compressed bodies.",
+                              ["direction", "encoding"], buckets=(1, 1.5, 2, 3, 4, 6, 8, 12, 16, 32, 64, 128))
+COMPRESSION_SECONDS = Histogram("athena_compression_seconds", "CPU time spent compressing or decompressing a body.",
+                                ["direction", "encoding"], buckets=BUCKETS)
+
+_STAGE_SERIES = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+
+class StageTimer:
+    """Lap timer: mark(stage) charges the time since the previous mark to stage,
+    minus whatever add() recorded in between (e.g. HMAC updates inside the body read)."""
+
+    __slots__ = ("stages", "started", "_last", "_carved")
+
+    def __init__(self):
+        self.stages = {}
+        self.started = self._last = time.perf_counter()
+        self._carved = 0.0
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self._carved += seconds
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last - self._carved)
+        self._last, self._carved = now, 0.0
+
+    def elapsed(self, excluding: tuple = ()) -> float:
+        """Seconds since the timer started, less the time charged to the excluded stages."""
+        return time.perf_counter() - self.started - sum(self.stages.get(stage, 0.0) for stage in excluding)
+
+    def observe(self):
+        for stage, seconds in self.stages.items():
+            _STAGE_SERIES[stage].observe(seconds)
+
+    def breakdown_ms(self) -> dict:
+        """Stage durations in ms, in stage order, plus "total" since the timer started."""
+        timing = {stage: round(self.stages[stage] * 1000, 3) for stage in STAGES if stage in self.stages}
+        timing["total"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timing
+
+
+def server_timing(timing: dict) -> str:
+    """Server-Timing header value, e.g. "parse;dur=0.041, schema;dur=0.12, total;dur=1.9"."""
+    return ", ".join(f"{stage};dur={ms}" for stage, ms in timing.items())
+
+
+class LabelLimiter:
+    """Caps a free-form label at max_values distinct values; later ones become "other"."""
+
+    def __init__(self, max_values: int = 50, allowed: Optional[set] = None):
+        self.max_values = max_values
+        self.allowed = allowed
+        self._seen = set()
+
+    def __call__(self, value) -> str:
+        if not isinstance(value, str) or not value:
+            return "unknown"
+        if self.allowed is not None:
+            return value if value in self.allowed else "other"
+        if value in self._seen:
+            return value
+        if len(self._seen) < self.max_values:
+            self._seen.add(value)
+            return value
+        return "other"
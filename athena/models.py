@@ -0,0 +1,19 @@
+"""
+Athena CAP payload model.
+Kept outside app.py so validation pool workers can import it.
+"""
+
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class CAPPayload(BaseModel):
+    cap_id: str
+    timestamp: str
+    domain: str
+    context_mode: str
+    advisor_of_record: str
+    outputs: Any
+    cap_extensions: Any
+    integrity: Any
@@ -0,0 +1,167 @@
+"""
+Athena durable relay outbox.
+Write-ahead log of CAPs accepted in queued mode: a PUT record is committed
+before /cap answers 202, an ACK record is appended once the bridge accepts it,
+and anything left unacknowledged is replayed on the next start. A CAP the bridge
+refuses for good (4xx) or that exhausts its retries is copied, as its PUT
+record, to a separate never-compacted "deadletter" log and then acknowledged.
+
+PUT record: b"P" + trace_id (36 ASCII) + u8 signature length + signature + CAP body.
+Typed PUT (non-JSON or Content-Encoding'd body): b"Q" + the same, with u8 media type
+length + media type + u8 content coding length + content coding before the body.
+ACK record: b"A" + trace_id.
+"""
+
+import logging, os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from athena import codec
+from athena.relay import RelayItem
+from athena.segment_log import FsyncPolicy, SegmentLog
+
+PUT, PUT_TYPED, ACK = b"P", b"Q", b"A"
+TRACE_ID_LEN = 36
+
+
+class Outbox:
+    """Relay outbox on top of SegmentLog.
+
+    Compaction drops whole segments from the oldest end once every PUT in them
+    is acknowledged; ACKs only ever refer to the same or older segments, so a
+    deleted prefix can never resurrect a delivered CAP. On open, still-pending
+    entries are copied forward into the new active segment and all older
+    segments are removed, so one stuck entry never pins the log forever; while
+    running, dead-lettering keeps undeliverable CAPs from pinning it.
+    """
+
+    def __init__(self, log: SegmentLog, dead_letters: Optional[SegmentLog] = None):
+        self.log = log
+        self.dead_letters = dead_letters or SegmentLog(log.directory, "deadletter", policy=log.policy)
+        self.dead_lettered = 0
+        self._pending: Set[str] = set()
+        self._segment_of: Dict[str, int] = {}
+        self._open_puts: Dict[int, Set[str]] = {}
+        self.replayed = 0
+        self.acked = 0
+        self.compacted_segments = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["Outbox"]:
+        directory = os.getenv("OUTBOX_DIR", "")
+        if not directory:
+            return None
+        return cls(SegmentLog(
+            Path(directory), "outbox",
+            segment_bytes=int(os.getenv("OUTBOX_SEGMENT_BYTES", str(16 << 20))),
+            policy=FsyncPolicy.from_env("OUTBOX"),
+        ))
+
+    # --- Lifecycle ----------------------------------------------------------
+    @staticmethod
+    def _encode_put(item: RelayItem) -> bytes:
+        signature = (item.signature or "").encode("ascii")
+        head = (item.trace_id.encode("ascii"), bytes((len(signature),)), signature)
+        if item.content_type == codec.JSON and item.content_encoding is None:
+            return b"".join((PUT, *head, item.body))
+        media = item.content_type.encode("ascii")
+        coding = (item.content_encoding or "").encode("ascii")
+        return b"".join((PUT_TYPED, *head, bytes((len(media),)), media, bytes((len(coding),)), coding, item.body))
+
+    @staticmethod
+    def _decode_put(trace_id: str, record: bytes) -> RelayItem:
+        pos = 1 + TRACE_ID_LEN
+        sig_len = record[pos]
+        signature = record[pos + 1: pos + 1 + sig_len].decode("ascii") or None
+        pos += 1 + sig_len
+        if record[:1] == PUT:
+            return RelayItem(trace_id, record[pos:], signature)
+        media_len = record[pos]
+        media = record[pos + 1: pos + 1 + media_len].decode("ascii")
+        pos += 1 + media_len
+        coding_len = record[pos]
+        coding = record[pos + 1: pos + 1 + coding_len].decode("ascii") or None
+        return RelayItem(trace_id, record[pos + 1 + coding_len:], signature, media, coding)
+
+    async def open(self) -> List[RelayItem]:
+        """Open the log and return the unacknowledged CAPs to replay."""
+        pending: "OrderedDict[str, RelayItem]" = OrderedDict()
+        for _, record in self.log.scan():
+            kind, trace_id = record[:1], record[1:1 + TRACE_ID_LEN].decode("ascii")
+            if kind in (PUT, PUT_TYPED):
+                pending[trace_id] = self._decode_put(trace_id, record)
+            elif kind == ACK:
+                pending.pop(trace_id, None)
+        old_segments = self.log.segments()
+
+        await self.log.open()
+        await self.dead_letters.open()
+        for item in pending.values():
+            await self.put(item)
+        for segment in old_segments:
+            self.log.remove_segment(segment)
+            self.compacted_segments += 1
+
+        self.replayed = len(pending)
+        if pending:
+            logging.warning(f"Outbox replaying {len(pending)} unacknowledged CAP relay(s)")
+        return list(pending.values())
+
+    async def close(self):
+        await self.log.close()
+        await self.dead_letters.close()
+
+    # --- Records ------------------------------------------------------------
+    async def put(self, item: RelayItem):
+        """Durably record an accepted CAP before it is acknowledged to the producer."""
+        segment = await self.log.append(self._encode_put(item))
+        self._pending.add(item.trace_id)
+        self._segment_of[item.trace_id] = segment
+        self._open_puts.setdefault(segment, set()).add(item.trace_id)
+
+    async def ack(self, trace_id: str):
+        """Mark a CAP as delivered; the ACK itself is write-behind (replay is at-least-once)."""
+        if trace_id not in self._pending:
+            return
+        self._pending.discard(trace_id)
+        record = ACK + trace_id.encode("ascii")
+        if not self.log.append_nowait(record):
+            await self.log.append(record)
+        self.acked += 1
+        segment = self._segment_of.pop(trace_id)
+        open_puts = self._open_puts[segment]
+        open_puts.discard(trace_id)
+        if not open_puts and segment < self.log.active_segment:
+            self.compact()
+
+    async def dead_letter(self, item: RelayItem, result: dict):
+        """Set aside a CAP that will not be delivered, then acknowledge it so it stops
+        pinning its segment. The dead-letter copy is committed before the ACK."""
+        if item.trace_id not in self._pending:
+            return
+        await self.dead_letters.append(self._encode_put(item))
+        self.dead_lettered += 1
+        logging.warning("[TRACE %s] CAP dead-lettered after relay %s (%s)", item.trace_id, result.get("relay"),
+                        result.get("code") or result.get("message") or "", extra={"trace_id": item.trace_id})
+        await self.ack(item.trace_id)
+
+    def compact(self):
+        """Remove the oldest segments whose PUTs are all acknowledged."""
+        for segment in self.log.segments():
+            if segment >= self.log.active_segment or self._open_puts.get(segment):
+                break
+            self.log.remove_segment(segment)
+            self._open_puts.pop(segment, None)
+            self.compacted_segments += 1
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            **self.log.stats(),
+            "pending": len(self._pending),
+            "acked": self.acked,
+            "replayed": self.replayed,
+            "compacted_segments": self.compacted_segments,
+            "dead_lettered": self.dead_lettered,
+        }
@@ -0,0 +1,121 @@
+"""
+Athena admission rate limiting.
+Token buckets per (scope, client): "cap" for /cap, "bulk" for /cap/batch and
+/cap/stream. The client is the X-Athena-Key-Id (or the default key) when the
+key ring knows it, otherwise the client IP, so made-up key ids cannot mint
+fresh buckets and push real clients' buckets out of the LRU. A check is a dict
+lookup plus a lazy refill, made from headers alone before the body is read,
+and a refused request learns exactly when its next token is due (Retry-After).
+"""
+
+import math, os, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class RateLimitConfig:
+    cap_rate: float = 0.0     # tokens/s per client on /cap; 0 disables the scope
+    cap_burst: float = 0.0    # bucket size; defaults to one second of rate
+    bulk_rate: float = 0.0    # tokens/s per client on /cap/batch and /cap/stream
+    bulk_burst: float = 0.0
+    key_by: str = "key"       # "key" (signing key id) or "ip"
+    trust_forwarded: bool = False  # take the client IP from X-Forwarded-For (behind a proxy)
+    max_clients: int = 10000  # LRU bound on tracked buckets per scope
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        return cls(
+            cap_rate=float(os.getenv("ATHENA_RATE_CAP_PER_S", "0")),
+            cap_burst=float(os.getenv("ATHENA_RATE_CAP_BURST", "0")),
+            bulk_rate=float(os.getenv("ATHENA_RATE_BULK_PER_S", "0")),
+            bulk_burst=float(os.getenv("ATHENA_RATE_BULK_BURST", "0")),
+            key_by=os.getenv("ATHENA_RATE_KEY_BY", "key").lower(),
+            trust_forwarded=os.getenv("ATHENA_TRUST_FORWARDED_FOR", "0") == "1",
+            max_clients=int(os.getenv("ATHENA_RATE_MAX_CLIENTS", "10000")),
+        )
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens, self.updated = tokens, updated
+
+
+class TokenBuckets:
+    """One scope's buckets. Evicting an idle client's bucket only refills it early."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst or rate, 1.0)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def take(self, client: str, cost: float = 1.0) -> Optional[float]:
+        """Spend cost tokens; returns None when admitted, else seconds until they are available."""
+        now = self._clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = _Bucket(self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._buckets.move_to_end(client)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            self.allowed += 1
+            return None
+        self.limited += 1
+        return (cost - bucket.tokens) / self.rate
+
+    def stats(self) -> dict:
+        return {"rate_per_s": self.rate, "burst": self.burst, "clients": len(self._buckets),
+                "allowed": self.allowed, "limited": self.limited, "evicted": self.evicted}
+
+
+class RateLimiter:
+    def __init__(self, config: RateLimitConfig, clock=time.monotonic):
+        self.config = config
+        self.scopes = {}
+        for scope, rate, burst in (("cap", config.cap_rate, config.cap_burst),
+                                   ("bulk", config.bulk_rate, config.bulk_burst)):
+            if rate > 0:
+                self.scopes[scope] = TokenBuckets(rate, burst, config.max_clients, clock)
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(RateLimitConfig.from_env())
+
+    def client(self, headers, client_host: Optional[str], keyring) -> str:
+        """Bucket name for a request; keyring is the KeyRing (membership test and default key id)."""
+        if self.config.key_by == "key":
+            key_id = headers.get("x-athena-key-id") or keyring.default_key_id
+            if key_id in keyring:
+                return "key:" + key_id
+        if self.config.trust_forwarded:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                return "ip:" + forwarded.split(",", 1)[0].strip()
+        return "ip:" + (client_host or "unknown")
+
+    def check(self, scope: str, client: str) -> Tuple[bool, int]:
+        """(admitted, Retry-After seconds); scopes without a configured rate always admit."""
+        buckets = self.scopes.get(scope)
+        if buckets is None:
+            return True, 0
+        wait = buckets.take(client)
+        if wait is None:
+            return True, 0
+        return False, max(1, math.ceil(wait))
+
+    def stats(self) -> dict:
+        return {"key_by": self.config.key_by, **{scope: b.stats() for scope, b in self.scopes.items()}}
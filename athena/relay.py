@@ -0,0 +1,249 @@
+"""
+Athena CAP relay client.
+One pooled keep-alive aiohttp session to BRIDGE_URL, shared by every request,
+opened in the app lifespan and closed on shutdown. Calls go through a circuit
+breaker and use a timeout that tracks the bridge's observed p99 latency.
+
+CAPs are forwarded as the exact bytes the producer signed, together with the
+producer's X-Athena-Signature, so the bridge can verify the same signature.
+A CAP in an encoding the bridge does not accept (BRIDGE_ACCEPT) is transcoded
+to the bridge's preferred one and relayed unsigned.
+
+A CAP that arrived Content-Encoding'd keeps its wire bytes and signature when the
+bridge takes that coding, and is decoded (and unsigned) otherwise. Bodies no
+signature covers (unsigned CAPs, batches) are compressed with the bridge's
+preferred coding once it is known: RELAY_COMPRESSION=auto learns it from the
+bridge's Accept-Encoding response header (RFC 7694), a list of codings fixes it,
+"off" never compresses. A 415 to a compressed request drops that coding and resends.
+"""
+
+import asyncio, logging, os, time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import aiohttp
+
+from athena import codec, compression
+from athena.breaker import HALF_OPEN, AdaptiveTimeout, BreakerConfig, CircuitBreaker, CircuitOpen
+
+
+@dataclass
+class RelayItem:
+    """One CAP on its way to the bridge.
+    body is forwarded untouched; anything that rewrites the CAP must build a
+    new body and drop the signature, since it no longer covers those bytes."""
+    trace_id: str
+    body: bytes
+    signature: Optional[str] = None
+    content_type: str = codec.JSON
+    content_encoding: Optional[str] = None  # body is in this Content-Encoding (as received)
+
+
+@dataclass
+class RelayConfig:
+    bridge_url: str = ""
+    token: str = ""
+    pool_size: int = 20            # max concurrent connections to the bridge
+    keepalive_s: float = 30.0      # idle keep-alive before a pooled connection closes
+    connect_timeout_s: float = 3.0 # acquiring a pooled connection + TCP/TLS connect
+    read_timeout_s: float = 10.0   # max gap between reads from the bridge
+    total_timeout_s: float = 10.0  # whole request budget (upper bound of the adaptive timeout)
+    min_timeout_s: float = 0.5     # lower bound of the adaptive timeout
+    timeout_multiplier: float = 3.0  # adaptive timeout = observed p99 × this
+    accept: Tuple[str, ...] = (codec.JSON,)  # CAP media types the bridge takes, preferred first
+    compression: str = "auto"      # off | auto (learn from the bridge) | codings the bridge takes
+    compression_min_bytes: int = 1024  # smaller bodies are sent as-is
+    compression_level: Optional[int] = None  # None: the coding's default
+
+    @classmethod
+    def from_env(cls) -> "RelayConfig":
+        return cls(
+            bridge_url=os.getenv("BRIDGE_URL", "").rstrip("/"),
+            token=os.getenv("RENDER_API_TOKEN", ""),
+            pool_size=int(os.getenv("RELAY_POOL_SIZE", "20")),
+            keepalive_s=float(os.getenv("RELAY_KEEPALIVE_S", "30")),
+            connect_timeout_s=float(os.getenv("RELAY_CONNECT_TIMEOUT_S", "3")),
+            read_timeout_s=float(os.getenv("RELAY_READ_TIMEOUT_S", "10")),
+            total_timeout_s=float(os.getenv("RELAY_TOTAL_TIMEOUT_S", "10")),
+            min_timeout_s=float(os.getenv("RELAY_MIN_TIMEOUT_S", "0.5")),
+            timeout_multiplier=float(os.getenv("RELAY_TIMEOUT_MULTIPLIER", "3")),
+            accept=tuple(codec.media_type(m) for m in os.getenv("BRIDGE_ACCEPT", codec.JSON).split(",") if m.strip()),
+            compression=os.getenv("RELAY_COMPRESSION", "auto").lower(),
+            compression_min_bytes=int(os.getenv("RELAY_COMPRESSION_MIN_BYTES", "1024")),
+            compression_level=int(os.environ["RELAY_COMPRESSION_LEVEL"]) if os.getenv("RELAY_COMPRESSION_LEVEL") else None,
+        )
+
+
+class RelayClient:
+    """Async relay to {BRIDGE_URL}/cap over a shared connection pool."""
+
+    def __init__(self, config: RelayConfig, breaker: Optional[CircuitBreaker] = None):
+        self.config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.breaker = breaker or CircuitBreaker(BreakerConfig.from_env())
+        self.timeouts = AdaptiveTimeout(min_s=config.min_timeout_s, max_s=config.total_timeout_s,
+                                        multiplier=config.timeout_multiplier)
+        self.counts = {"success": 0, "failed": 0, "error": 0, "skipped": 0, "short_circuited": 0}
+        self.transcoded = 0
+        # Content codings the bridge accepts, preferred first
+        if config.compression in ("off", "auto"):
+            self.bridge_encodings: Tuple[str, ...] = ()
+        else:
+            self.bridge_encodings = compression.parse_accept_encoding(config.compression)
+        self.compression = {"compressed": 0, "bytes_in": 0, "bytes_out": 0, "decoded": 0, "refused": 0}
+
+    async def start(self):
+        if not self.config.bridge_url or self._session is not None:
+            return
+        c = self.config
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=c.pool_size, limit_per_host=c.pool_size,
+                                           keepalive_timeout=c.keepalive_s),
+            timeout=aiohttp.ClientTimeout(total=c.total_timeout_s, connect=c.connect_timeout_s,
+                                          sock_read=c.read_timeout_s),
+        )
+        logging.info(f"Relay pool opened → {c.bridge_url} (pool={c.pool_size})")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.config.token:
+            headers["Authorization"] = f"Bearer {self.config.token}"
+        return headers
+
+    async def _post(self, path: str, headers: dict, **kwargs):
+        """POST through the breaker with the adaptive timeout; returns (status, reply).
+        Raises CircuitOpen while the breaker is open, and transport errors as-is."""
+        if not self.breaker.allow():
+            raise CircuitOpen(f"Bridge circuit {self.breaker.state}")
+        c = self.config
+        # half-open probes get the full budget: the learned timeout may be why the breaker opened
+        total = c.total_timeout_s if self.breaker.state == HALF_OPEN else self.timeouts.current()
+        timeout = aiohttp.ClientTimeout(total=total, connect=c.connect_timeout_s, sock_read=c.read_timeout_s)
+        t0 = time.monotonic()
+        try:
+            async with self._session.post(f"{c.bridge_url}{path}", headers=headers,
+                                          timeout=timeout, **kwargs) as response:
+                status = response.status
+                if self.config.compression == "auto" and "Accept-Encoding" in response.headers:
+                    self.bridge_encodings = compression.parse_accept_encoding(response.headers["Accept-Encoding"])
+                reply = await response.json(loads=codec.loads, content_type=None) if status == 200 else await response.text()
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except Exception as e:
+            elapsed = time.monotonic() - t0
+            self.breaker.record(False, elapsed)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts.observe_timeout(total)
+            raise
+        elapsed = time.monotonic() - t0
+        ok = status < 500 and status != 429
+        self.breaker.record(ok, elapsed)
+        if ok:
+            self.timeouts.observe(elapsed)
+        return status, reply
+
+    async def relay(self, item: RelayItem) -> dict:
+        trace_id = item.trace_id
+        bridge_url = self.config.bridge_url
+        if not bridge_url or self._session is None:
+            logging.warning("[TRACE %s] No BRIDGE_URL set — skipping relay.", trace_id,
+                            extra={"trace_id": trace_id, "sample": True})
+            self.counts["skipped"] += 1
+            return {"relay": "skipped", "reason": "BRIDGE_URL not set"}
+
+        try:
+            body, headers = self._outgoing(item)
+            status, reply = await self._post("/cap", headers, data=body)
+            if status == 415 and "Content-Encoding" in headers:
+                self._refused(headers["Content-Encoding"])
+                body, headers = self._outgoing(item)
+                status, reply = await self._post("/cap", headers, data=body)
+        except CircuitOpen as e:
+            self.counts["short_circuited"] += 1
+            return {"relay": "short_circuited", "reason": str(e)}
+        except Exception as e:
+            logging.error("[TRACE %s] CAP relay exception: %r", trace_id, e, extra={"trace_id": trace_id})
+            self.counts["error"] += 1
+            return {"relay": "error", "message": str(e) or type(e).__name__}
+        if status == 200:
+            logging.info("[TRACE %s] CAP relay succeeded to %s", trace_id, bridge_url,
+                         extra={"trace_id": trace_id, "sample": True})
+            self.counts["success"] += 1
+            return {"relay": "success", "bridge_status": reply}
+        logging.warning("[TRACE %s] CAP relay failed: %s", trace_id, status, extra={"trace_id": trace_id})
+        self.counts["failed"] += 1
+        return {"relay": "failed", "code": status, "body": reply}
+
+    def _outgoing(self, item: RelayItem) -> Tuple[bytes, dict]:
+        """Body and headers to send for item, given what the bridge accepts."""
+        body, signature, content_type, encoding = item.body, item.signature, item.content_type, item.content_encoding
+        if encoding is not None and (encoding not in self.bridge_encodings or content_type not in self.config.accept):
+            # the producer's signature covers the compressed bytes only
+            body, signature, encoding = compression.decode(body, encoding), None, None
+            self.compression["decoded"] += 1
+        if content_type not in self.config.accept:
+            # the producer's signature covers the original encoding only
+            content_type = self.config.accept[0]
+            body, signature = codec.encode_body(codec.decode_body(body, item.content_type), content_type), None
+            self.transcoded += 1
+        if encoding is None and signature is None:
+            body, encoding = self._compress(body)
+        headers = {**self._headers(), "Content-Type": content_type}
+        if signature:
+            headers["X-Athena-Signature"] = signature
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return body, headers
+
+    def _compress(self, body: bytes) -> Tuple[bytes, Optional[str]]:
+        """(body, None), or the body in the bridge's preferred coding when that is smaller."""
+        if not self.bridge_encodings or len(body) < self.config.compression_min_bytes:
+            return body, None
+        encoding = self.bridge_encodings[0]
+        encoded = compression.encode(body, encoding, self.config.compression_level)
+        if len(encoded) >= len(body):
+            return body, None
+        self.compression["compressed"] += 1
+        self.compression["bytes_in"] += len(body)
+        self.compression["bytes_out"] += len(encoded)
+        return encoded, encoding
+
+    def _refused(self, encoding: str):
+        """The bridge answered 415 to a compressed request: stop using that coding."""
+        logging.warning(f"Bridge refused Content-Encoding {encoding}; relaying without it")
+        self.bridge_encodings = tuple(e for e in self.bridge_encodings if e != encoding)
+        self.compression["refused"] += 1
+
+    async def post_batch(self, body: bytes, content_type: str):
+        """POST an encoded batch to {BRIDGE_URL}/cap/batch; returns (status, parsed body or text).
+        Raises CircuitOpen or transport errors so the caller can fail every item in the batch.
+        The batch body itself is unsigned (items carry their own signatures), so it may be compressed."""
+        headers = {**self._headers(), "Content-Type": content_type}
+        sent, encoding = self._compress(body)
+        if encoding is None:
+            return await self._post("/cap/batch", headers, data=body)
+        status, reply = await self._post("/cap/batch", {**headers, "Content-Encoding": encoding}, data=sent)
+        if status == 415:
+            self._refused(encoding)
+            status, reply = await self._post("/cap/batch", headers, data=body)
+        return status, reply
+
+    def stats(self) -> dict:
+        return {
+            "bridge_url": self.config.bridge_url or None,
+            "pool_size": self.config.pool_size,
+            "accept": list(self.config.accept),
+            "transcoded": self.transcoded,
+            "compression": {"mode": self.config.compression, "bridge_encodings": list(self.bridge_encodings),
+                            **self.compression},
+            "results": dict(self.counts),
+            "timeout_s": round(self.timeouts.current(), 3),
+            "p99_latency_s": round(self.timeouts.p99_s, 4) if self.timeouts.p99_s is not None else None,
+            "breaker": self.breaker.stats(),
+        }
@@ -0,0 +1,202 @@
+"""
+Athena relay batching stage.
+Coalesces CAPs into one POST to {BRIDGE_URL}/cap/batch, flushing on item count,
+byte budget (of the encoded body; a CAP that would overflow it starts the next
+batch, and one larger than the budget goes alone) or max linger time, and maps the bridge's per-item results back to
+each caller's trace_id.
+
+Bridge contract: the body is a JSON array (or NDJSON) of envelopes in
+submission order, {"trace_id": ..., "signature": ..., "cap": <CAP>}, with each
+CAP's original bytes embedded unchanged after the "cap": key (signature is null
+where NDJSON framing forced a CAP to be re-serialised); the reply is
+{"results": [...]} (or a bare list), one entry per CAP, either in the same
+order or each carrying its "trace_id". An entry counts as delivered unless it
+has a non-2xx "status" or "ok": false.
+"""
+
+import asyncio, logging, os, time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from athena import codec
+from athena.breaker import CircuitOpen
+from athena.relay import RelayClient, RelayItem
+
+FORMATS = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+@dataclass
+class BatchConfig:
+    max_items: int = 100
+    max_bytes: int = 1 << 20
+    linger_ms: float = 20.0
+    format: str = "json"
+
+    @classmethod
+    def from_env(cls) -> "BatchConfig":
+        config = cls(
+            max_items=int(os.getenv("RELAY_BATCH_MAX_ITEMS", "0")),
+            max_bytes=int(os.getenv("RELAY_BATCH_MAX_BYTES", str(1 << 20))),
+            linger_ms=float(os.getenv("RELAY_BATCH_LINGER_MS", "20")),
+            format=os.getenv("RELAY_BATCH_FORMAT", "json").lower(),
+        )
+        if config.format not in FORMATS:
+            raise ValueError(f"Unknown RELAY_BATCH_FORMAT: {config.format}")
+        return config
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_items > 1
+
+
+class _Item:
+    __slots__ = ("trace_id", "envelope", "future")
+
+    def __init__(self, item: RelayItem, body: bytes, signature: Optional[str], future: asyncio.Future):
+        self.trace_id, self.future = item.trace_id, future
+        # per-item metadata rides in the body: headers would cap the batch at ~8 KiB of them
+        self.envelope = b"".join((b'{"trace_id":', codec.dumps(item.trace_id), b',"signature":',
+                                  codec.dumps(signature), b',"cap":', body, b"}"))
+
+
+class BatchRelay:
+    """Drop-in for RelayClient.relay() that sends CAPs to the bridge in batches."""
+
+    def __init__(self, client: RelayClient, config: BatchConfig):
+        self.client = client
+        self.config = config
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._sending = set()
+        self.batches = 0
+        self.items = 0
+        self.flush_reasons = {"items": 0, "bytes": 0, "linger": 0}
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher is not None:
+            await self._queue.put(None)
+            await self._flusher
+            self._flusher = None
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def relay(self, item: RelayItem) -> dict:
+        if not self.client.config.bridge_url or item.content_type != codec.JSON or item.content_encoding:
+            return await self.client.relay(item)  # batches are uncompressed JSON / NDJSON only
+        body, signature = item.body, item.signature
+        if self.config.format == "ndjson" and (b"\n" in body or b"\r" in body):
+            # Pretty-printed CAPs can't be NDJSON lines as-is; this item loses its signature.
+            body, signature = codec.canonical(codec.loads(body)), None
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Item(item, body, signature, future))
+        return await future
+
+    # --- Batching -----------------------------------------------------------
+    async def _flush_loop(self):
+        c = self.config
+        # encoded size is the envelopes plus one separator each, plus "[" and "]" for JSON
+        base = 1 if c.format == "json" else 0
+        stopping = False
+        carry: Optional[_Item] = None  # didn't fit the previous batch
+        while not stopping:
+            item, carry = carry or await self._queue.get(), None
+            if item is None:
+                break
+            batch: List[_Item] = [item]
+            size = base + len(item.envelope) + 1
+            reason = "linger"
+            deadline = time.monotonic() + c.linger_ms / 1000
+            while True:
+                if len(batch) >= c.max_items:
+                    reason = "items"
+                    break
+                if size >= c.max_bytes:
+                    reason = "bytes"
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                if size + len(item.envelope) + 1 > c.max_bytes:
+                    carry, reason = item, "bytes"
+                    break
+                batch.append(item)
+                size += len(item.envelope) + 1
+
+            self.flush_reasons[reason] += 1
+            task = asyncio.create_task(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    def _encode(self, batch: List[_Item]) -> bytes:
+        if self.config.format == "ndjson":
+            return b"\n".join(i.envelope for i in batch) + b"\n"
+        return b"[" + b",".join(i.envelope for i in batch) + b"]"
+
+    async def _send(self, batch: List[_Item]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            status, reply = await self.client.post_batch(self._encode(batch), FORMATS[self.config.format])
+        except CircuitOpen as e:
+            self._resolve_all(batch, {"relay": "short_circuited", "reason": str(e)})
+            return
+        except Exception as e:
+            logging.error("Batch relay of %d CAP(s) failed: %r", len(batch), e)
+            self._resolve_all(batch, {"relay": "error", "message": str(e) or type(e).__name__})
+            return
+        if status != 200:
+            logging.warning("Batch relay of %d CAP(s) failed: %s", len(batch), status)
+            self._resolve_all(batch, {"relay": "failed", "code": status, "body": reply})
+            return
+
+        results = reply.get("results") if isinstance(reply, dict) else reply
+        if not isinstance(results, list) or len(results) != len(batch):
+            self._resolve_all(batch, {"relay": "error", "message": "Bridge batch reply does not match batch size"})
+            return
+        by_trace = {r.get("trace_id"): r for r in results if isinstance(r, dict) and r.get("trace_id")}
+        for i, item in enumerate(batch):
+            result = by_trace.get(item.trace_id, results[i])
+            self._resolve(item, self._item_result(result))
+        logging.info("Batch relay of %d CAP(s) succeeded", len(batch), extra={"sample": True})
+
+    @staticmethod
+    def _item_result(result) -> dict:
+        if isinstance(result, dict):
+            status = result.get("status", 200)
+            if result.get("ok") is False or (isinstance(status, int) and not 200 <= status < 300):
+                return {"relay": "failed", "code": status, "body": result}
+        return {"relay": "success", "bridge_status": result}
+
+    def _resolve(self, item: _Item, result: dict):
+        self.client.counts[result["relay"]] += 1
+        if not item.future.done():
+            item.future.set_result(result)
+
+    def _resolve_all(self, batch: List[_Item], result: dict):
+        for item in batch:
+            self._resolve(item, dict(result))
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "max_items": self.config.max_items,
+            "max_bytes": self.config.max_bytes,
+            "linger_ms": self.config.linger_ms,
+            "format": self.config.format,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "flush_reasons": dict(self.flush_reasons),
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
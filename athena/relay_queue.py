@@ -0,0 +1,206 @@
+"""
+Athena background relay queue.
+Validated CAPs go onto a bounded in-process queue drained by N async workers,
+so /cap can answer 202 without waiting for the bridge round-trip. Transient
+failures (transport errors, open breaker, 5xx / 408 / 429) are retried with
+jittered exponential backoff; on_done sees only final outcomes.
+"""
+
+import asyncio, logging, os, random, time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from athena.metrics import RELAY_QUEUED_SECONDS
+from athena.relay import RelayItem
+
+RelayFn = Callable[[RelayItem], Awaitable[dict]]
+DoneFn = Callable[[RelayItem, dict], Awaitable[None]]
+
+
+def is_transient(result: dict) -> bool:
+    """Worth retrying: the bridge was unreachable or overloaded, not refusing the CAP."""
+    relay = result.get("relay")
+    if relay in ("error", "short_circuited"):
+        return True
+    if relay == "failed":
+        code = result.get("code")
+        return not isinstance(code, int) or code >= 500 or code in (408, 429)
+    return False
+
+
+class RelayQueue:
+    """Bounded relay queue + worker pool with per-trace_id outcome tracking."""
+
+    def __init__(self, relay_fn: RelayFn, maxsize: int = 1000, workers: int = 4,
+                 status_capacity: int = 10000, drain_timeout_s: float = 5.0,
+                 on_done: Optional[DoneFn] = None, max_attempts: int = 10,
+                 retry_base_s: float = 0.5, retry_max_s: float = 60.0):
+        self._relay_fn = relay_fn
+        self._on_done = on_done
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._workers = []
+        self._status = OrderedDict()
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.status_capacity = status_capacity
+        self.drain_timeout_s = drain_timeout_s
+        self.max_attempts = max_attempts  # 0: retry transient failures forever
+        self.retry_base_s = retry_base_s
+        self.retry_max_s = retry_max_s
+        self._attempts: Dict[str, int] = {}
+        self._retries = set()
+        self.retried = 0
+        self.gave_up = 0
+        self.busy = 0
+        self.busy_s = 0.0
+        self.started_at = time.monotonic()
+        self.enqueued = 0
+        self.rejected = 0
+        self.completed = 0
+        self.queued_total_ms = 0.0
+        self.queued_max_ms = 0.0
+
+    @classmethod
+    def from_env(cls, relay_fn: RelayFn, on_done: Optional[DoneFn] = None) -> "RelayQueue":
+        return cls(
+            relay_fn,
+            on_done=on_done,
+            maxsize=int(os.getenv("RELAY_QUEUE_SIZE", "1000")),
+            workers=int(os.getenv("RELAY_WORKERS", "4")),
+            status_capacity=int(os.getenv("RELAY_STATUS_CAPACITY", "10000")),
+            drain_timeout_s=float(os.getenv("RELAY_DRAIN_TIMEOUT_S", "5")),
+            max_attempts=int(os.getenv("RELAY_RETRY_MAX_ATTEMPTS", "10")),
+            retry_base_s=float(os.getenv("RELAY_RETRY_BASE_S", "0.5")),
+            retry_max_s=float(os.getenv("RELAY_RETRY_MAX_S", "60")),
+        )
+
+    # --- Lifecycle ----------------------------------------------------------
+    async def start(self):
+        self.started_at = time.monotonic()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logging.info(f"Relay queue started (size={self.maxsize}, workers={self.worker_count})")
+
+    async def stop(self):
+        """Give queued CAPs a bounded chance to drain, then stop the workers.
+        CAPs waiting for a retry are left to the outbox's replay on the next start."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout_s)
+        except asyncio.TimeoutError:
+            logging.warning(f"Relay queue stopped with {self._queue.qsize()} CAP(s) undelivered")
+        if self._retries:
+            logging.warning(f"Relay queue stopped with {len(self._retries)} CAP(s) awaiting retry")
+        for task in (*self._workers, *self._retries):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retries, return_exceptions=True)
+        self._workers = []
+        self._retries = set()
+
+    # --- Intake -------------------------------------------------------------
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def room(self) -> int:
+        return self.maxsize - self._queue.qsize()
+
+    async def put(self, item: RelayItem):
+        """Enqueue, waiting for room (outbox replay and /cap/stream backpressure, not /cap)."""
+        await self._queue.put((item, time.monotonic()))
+        self.enqueued += 1
+        self._set_status(item.trace_id, {"state": "queued"})
+
+    def submit(self, item: RelayItem) -> bool:
+        """Enqueue without waiting; False means the queue is full."""
+        try:
+            self._queue.put_nowait((item, time.monotonic()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        self._set_status(item.trace_id, {"state": "queued"})
+        return True
+
+    def status(self, trace_id: str) -> Optional[dict]:
+        return self._status.get(trace_id)
+
+    def _set_status(self, trace_id: str, status: dict):
+        self._status[trace_id] = status
+        self._status.move_to_end(trace_id)
+        while len(self._status) > self.status_capacity:
+            self._status.popitem(last=False)
+
+    # --- Workers ------------------------------------------------------------
+    async def _worker(self, n: int):
+        while True:
+            item, enqueued_at = await self._queue.get()
+            trace_id = item.trace_id
+            started = time.monotonic()
+            queued_ms = (started - enqueued_at) * 1000
+            RELAY_QUEUED_SECONDS.observe(started - enqueued_at)
+            self.queued_total_ms += queued_ms
+            self.queued_max_ms = max(self.queued_max_ms, queued_ms)
+            self.busy += 1
+            self._set_status(trace_id, {"state": "relaying", "queued_ms": round(queued_ms, 3)})
+            try:
+                result = await self._relay_fn(item)
+            except Exception as e:
+                logging.error("[TRACE %s] Relay worker %d error: %r", trace_id, n, e, extra={"trace_id": trace_id})
+                result = {"relay": "error", "message": str(e)}
+            finally:
+                self.busy -= 1
+                self.busy_s += time.monotonic() - started
+                self.completed += 1
+                self._queue.task_done()
+            attempt = self._attempts.pop(trace_id, 0) + 1
+            if is_transient(result) and (not self.max_attempts or attempt < self.max_attempts):
+                self._schedule_retry(item, attempt, result)
+                continue
+            if attempt > 1:
+                result = {**result, "attempts": attempt}
+                if is_transient(result):
+                    self.gave_up += 1
+            self._set_status(trace_id, {"state": "done", "queued_ms": round(queued_ms, 3),
+                                        "relay_result": result})
+            if self._on_done is not None:
+                try:
+                    await self._on_done(item, result)
+                except Exception as e:
+                    logging.error("[TRACE %s] Relay completion hook error: %r", trace_id, e,
+                                  extra={"trace_id": trace_id})
+
+    def _schedule_retry(self, item: RelayItem, attempt: int, result: dict):
+        delay = min(self.retry_max_s, self.retry_base_s * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        self._attempts[item.trace_id] = attempt
+        self.retried += 1
+        self._set_status(item.trace_id, {"state": "retrying", "attempt": attempt,
+                                         "retry_in_s": round(delay, 3), "relay_result": result})
+        logging.warning("[TRACE %s] Relay attempt %d failed (%s), retrying in %.2fs", item.trace_id, attempt,
+                        result.get("code") or result.get("relay"), delay, extra={"trace_id": item.trace_id})
+        task = asyncio.create_task(self._retry_later(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, item: RelayItem, delay: float):
+        await asyncio.sleep(delay)
+        await self._queue.put((item, time.monotonic()))  # retries wait for room; new intake is refused first
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "depth": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "workers": self.worker_count,
+            "workers_busy": self.busy,
+            "utilisation": round(self.busy_s / (uptime * self.worker_count), 4) if self.worker_count else 0.0,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "retried": self.retried,
+            "awaiting_retry": len(self._retries),
+            "gave_up": self.gave_up,
+            "queued_mean_ms": round(self.queued_total_ms / self.completed, 3) if self.completed else 0.0,
+            "queued_max_ms": round(self.queued_max_ms, 3),
+        }
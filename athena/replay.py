@@ -0,0 +1,146 @@
+"""
+Athena replay protection.
+Signature scheme v2 covers a timestamp and a nonce as well as the body:
+
+    X-Athena-Timestamp: <unix seconds>
+    X-Athena-Nonce:     <8-128 chars of [A-Za-z0-9_-]>
+    X-Athena-Signature: hex HMAC-SHA256(key, "<timestamp>.<nonce>." + body)
+
+Requests outside the skew window are refused before the body is read, and a
+nonce is accepted once per key. Seen nonces are kept in buckets by their
+signed timestamp, so a lookup touches one set and expiry drops a whole bucket.
+
+Sizing: an entry costs about 140 bytes. The bound defaults to twice
+ATHENA_NONCE_EXPECTED_RATE (v2 requests/s per instance, default 100) over every
+second the window accepts (2 * window + one bucket), i.e. 122k entries / ~17 MB
+for the defaults. Past it v2 requests get 503, so raise the expected rate (or
+set ATHENA_NONCE_MAX_ENTRIES outright) for busier instances;
+scripts/bench_nonce_cache.py shows the memory at a given rate.
+"""
+
+import math, os, re, sys, time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+NONCE = re.compile(r"^[A-Za-z0-9_-]{8,128}$")
+
+
+@dataclass
+class ReplayConfig:
+    window_s: int = 300           # accepted |now - timestamp|
+    bucket_s: int = 10            # nonce bucket width
+    max_entries: int = 0          # nonce cache bound (beyond it v2 requests get 503); 0 derives it
+    expected_rate: float = 100.0  # v2 requests/s per instance the derived bound is sized for
+    required: bool = False        # refuse unsigned-timestamp (v1) requests
+
+    def __post_init__(self):
+        if self.max_entries <= 0:
+            self.max_entries = math.ceil(2 * self.expected_rate * (2 * self.window_s + self.bucket_s))
+
+    @classmethod
+    def from_env(cls) -> "ReplayConfig":
+        return cls(
+            window_s=int(os.getenv("ATHENA_REPLAY_WINDOW_S", "300")),
+            bucket_s=int(os.getenv("ATHENA_NONCE_BUCKET_S", "10")),
+            max_entries=int(os.getenv("ATHENA_NONCE_MAX_ENTRIES", "0")),
+            expected_rate=float(os.getenv("ATHENA_NONCE_EXPECTED_RATE", "100")),
+            required=os.getenv("ATHENA_REQUIRE_REPLAY_PROTECTION", "0") == "1",
+        )
+
+
+def signed_prefix(timestamp: str, nonce: str) -> bytes:
+    return f"{timestamp}.{nonce}.".encode("ascii")
+
+
+class NonceCache:
+    """Seen (key_id, nonce) pairs, bucketed by signed timestamp."""
+
+    def __init__(self, config: ReplayConfig, clock=time.time):
+        self.config = config
+        self._clock = clock
+        self._buckets: Dict[int, Set[str]] = {}
+        self._oldest: Optional[int] = None
+        self.entries = 0
+        self.accepted = 0
+        self.replays = 0
+        self.stale = 0
+        self.full = 0
+        self.expired_buckets = 0
+        self._lookups = 0
+        self._lookup_total_s = 0.0
+        self._lookup_max_s = 0.0
+
+    def check_timestamp(self, timestamp: str) -> Optional[int]:
+        """Parsed timestamp if inside the skew window, else None."""
+        try:
+            ts = int(timestamp)
+        except (TypeError, ValueError):
+            ts = None
+        if ts is None or abs(self._clock() - ts) > self.config.window_s:
+            self.stale += 1
+            return None
+        return ts
+
+    def _expire(self, now: float):
+        cutoff = int(now - self.config.window_s) // self.config.bucket_s
+        while self._oldest is not None and self._oldest < cutoff:
+            bucket = self._buckets.pop(self._oldest, None)
+            if bucket is not None:
+                self.entries -= len(bucket)
+                self.expired_buckets += 1
+            # at most 2 * window_s / bucket_s + 1 buckets exist, so this min is bounded
+            self._oldest = min(self._buckets) if self._buckets else None
+
+    def add(self, key_id: str, nonce: str, ts: int) -> Optional[str]:
+        """Record the nonce; returns None when accepted, else "replay" or "full"."""
+        t0 = time.perf_counter()
+        self._expire(self._clock())
+        bucket_id = ts // self.config.bucket_s
+        bucket = self._buckets.get(bucket_id)
+        member = f"{key_id}:{nonce}"
+        if bucket is not None and member in bucket:
+            outcome = "replay"
+            self.replays += 1
+        elif self.entries >= self.config.max_entries:
+            outcome = "full"
+            self.full += 1
+        else:
+            if bucket is None:
+                bucket = self._buckets[bucket_id] = set()
+                if self._oldest is None or bucket_id < self._oldest:
+                    self._oldest = bucket_id
+            bucket.add(member)
+            self.entries += 1
+            self.accepted += 1
+            outcome = None
+        elapsed = time.perf_counter() - t0
+        self._lookups += 1
+        self._lookup_total_s += elapsed
+        self._lookup_max_s = max(self._lookup_max_s, elapsed)
+        return outcome
+
+    def approx_bytes(self) -> int:
+        """Sets plus member strings (sampled from one bucket); O(buckets)."""
+        total = sys.getsizeof(self._buckets)
+        for bucket in self._buckets.values():
+            total += sys.getsizeof(bucket)
+            if bucket:
+                total += len(bucket) * sys.getsizeof(next(iter(bucket)))
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "window_s": self.config.window_s,
+            "required": self.config.required,
+            "entries": self.entries,
+            "max_entries": self.config.max_entries,
+            "buckets": len(self._buckets),
+            "approx_bytes": self.approx_bytes(),
+            "accepted": self.accepted,
+            "replays": self.replays,
+            "stale": self.stale,
+            "full": self.full,
+            "expired_buckets": self.expired_buckets,
+            "lookup_mean_us": round(self._lookup_total_s / self._lookups * 1e6, 2) if self._lookups else 0.0,
+            "lookup_max_us": round(self._lookup_max_s * 1e6, 2),
+        }
@@ -0,0 +1,181 @@
+"""
+Athena strict CAP model tree.
+Builds pydantic v2 models from ATHENA_CAP_SCHEMA_v3_5.json (strict types, string
+enums as Literal, additionalProperties: false as extra="forbid", one model per
+CAP_EXT* extension) so a CAP is parsed and validated in one pass with
+model_validate_json, straight from the request bytes.
+
+JSON Schema semantics are kept where pydantic differs: integers accept integral
+floats (1.0), optional properties may be absent but not null, patterns use
+Python's re.search and formats go through jsonschema's FORMAT_CHECKER.
+"""
+
+import time
+from typing import Annotated, Any, Dict, List, Literal
+
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import ValidationError as SchemaError
+from pydantic import (AfterValidator, BaseModel, ConfigDict, Field, PlainValidator, StrictBool, StrictStr,
+                      StringConstraints, ValidationError, create_model)
+
+from athena.validation import TimedValidator, schema_sha256
+
+_ANNOTATIONS = {"$schema", "$id", "title", "description", "default", "canonical_version"}
+_SUPPORTED = _ANNOTATIONS | {
+    "type", "properties", "required", "additionalProperties", "items",
+    "enum", "pattern", "format", "minimum",
+}
+_FORMATS = Draft202012Validator.FORMAT_CHECKER
+_RESERVED = set(dir(BaseModel))
+
+
+# --- JSON Schema scalar types -----------------------------------------------
+def _json_number(integer: bool, minimum=None):
+    """int/float (never bool), as jsonschema sees "number"/"integer"; 1.0 is an integer."""
+    kind = "integer" if integer else "number"
+
+    def check(v):
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            raise ValueError(f"{v!r} is not of type {kind!r}")
+        if integer and isinstance(v, float) and not v.is_integer():
+            raise ValueError(f"{v!r} is not of type 'integer'")
+        if minimum is not None and v < minimum:
+            raise ValueError(f"{v!r} is less than the minimum of {minimum!r}")
+        return v
+    return Annotated[Any, PlainValidator(check)]
+
+
+def _format(fmt: str):
+    def check(v: str) -> str:
+        if not _FORMATS.conforms(v, fmt):
+            raise ValueError(f"{v!r} is not a {fmt!r}")
+        return v
+    return AfterValidator(check)
+
+
+# --- Model builder ----------------------------------------------------------
+def _camel(key: str) -> str:
+    return key if key.startswith("CAP_") else "".join(p[:1].upper() + p[1:] for p in key.split("_"))
+
+
+def _annotation(schema: dict, name: str):
+    unsupported = set(schema) - _SUPPORTED
+    if unsupported:
+        raise NotImplementedError(f"Unsupported schema keyword(s) at {name}: {sorted(unsupported)}")
+    declared = schema.get("type")
+    if declared is not None and not isinstance(declared, str):
+        raise NotImplementedError(f"Union types are not supported ({name})")
+
+    if "enum" in schema:
+        values = schema["enum"]
+        if declared != "string" or not all(isinstance(e, str) for e in values):
+            raise NotImplementedError(f"Only string enums are supported ({name})")
+        return Literal[tuple(values)]
+    if declared == "string":
+        metadata = []
+        if "pattern" in schema:
+            metadata.append(StringConstraints(pattern=schema["pattern"]))
+        if "format" in schema:
+            metadata.append(_format(schema["format"]))
+        return Annotated[(StrictStr, *metadata)] if metadata else StrictStr
+    if declared == "boolean":
+        return StrictBool
+    if declared in ("integer", "number"):
+        return _json_number(declared == "integer", schema.get("minimum"))
+    if declared == "array":
+        return List[_annotation(schema["items"], name + "Item")] if "items" in schema else List[Any]
+    if declared == "object":
+        if any(k in schema for k in ("properties", "required", "additionalProperties")):
+            return _model(schema, name)
+        return Dict[str, Any]
+    if declared is None and set(schema) <= _ANNOTATIONS:
+        return Any
+    raise NotImplementedError(f"Unsupported schema at {name}: {schema}")
+
+
+def _model(schema: dict, name: str) -> type:
+    additional = schema.get("additionalProperties", True)
+    if not isinstance(additional, bool):
+        raise NotImplementedError(f"Only boolean additionalProperties is supported ({name})")
+    required = set(schema.get("required", []))
+    fields = {}
+    for key, subschema in schema.get("properties", {}).items():
+        annotation = _annotation(subschema, name + _camel(key))
+        # optional: absent is fine (None stands in), an explicit null is not
+        default = ... if key in required else None
+        if key in _RESERVED or key.startswith("_"):
+            fields[f"f_{key}"] = (annotation, Field(default, alias=key))
+        else:
+            fields[key] = (annotation, default)
+    missing = required - set(schema.get("properties", {}))
+    if missing:
+        raise NotImplementedError(f"Required properties without a schema ({name}): {sorted(missing)}")
+    config = ConfigDict(strict=True, extra="allow" if additional else "forbid",
+                        regex_engine="python-re", protected_namespaces=())
+    return create_model(name, __config__=config, **fields)
+
+
+def build_cap_model(schema: dict) -> type:
+    """Root pydantic model for the CAP schema; raises NotImplementedError for
+    keywords it cannot express, so it never silently accepts more than jsonschema."""
+    return _model(schema, "CAP")
+
+
+# --- Validator --------------------------------------------------------------
+def _describe(error: dict) -> str:
+    path = "/".join(str(p) for p in error["loc"])
+    message = error["msg"].removeprefix("Value error, ")
+    return f"{message} (at {path})" if path else message
+
+
+class ModelCAPValidator(TimedValidator):
+    """Same interface as validation.CAPValidator; check() parses and validates raw
+    bytes in one pass instead of json.loads + CAPPayload + schema validation."""
+
+    kind = "pydantic"
+    single_pass = True
+
+    def __init__(self, schema: dict, schema_hash: str = None):
+        t0 = time.perf_counter()
+        self.model = build_cap_model(schema)
+        super().__init__(schema, schema_hash or schema_sha256(schema), (time.perf_counter() - t0) * 1000)
+
+    def _parse(self, item):
+        if isinstance(item, (bytes, bytearray, str)):
+            return self.model.model_validate_json(item)
+        return self.model.model_validate(item)
+
+    def check(self, item) -> dict:
+        """check_cap()'s result for one CAP (bytes, str or already-parsed dict)."""
+        t0 = time.perf_counter()
+        try:
+            cap = self._parse(item)
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            if error["type"] == "json_invalid" or (not error["loc"] and error["type"] == "model_type"):
+                return {"status": 400, "error": f"Invalid CAP payload: {_describe(error)}"}
+            return {"status": 422, "error": f"CAP schema validation error: {_describe(error)}"}
+        finally:
+            self._record((time.perf_counter() - t0) * 1000)
+        return {"status": 200, "cap_id": cap.cap_id, "domain": cap.domain, "context_mode": cap.context_mode}
+
+    def validate(self, instance):
+        """Raise a jsonschema ValidationError for an invalid (parsed) CAP."""
+        t0 = time.perf_counter()
+        try:
+            self.model.model_validate(instance)
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            raise SchemaError(_describe(error), path=list(error["loc"])) from None
+        finally:
+            self._record((time.perf_counter() - t0) * 1000)
+
+    def is_valid(self, instance) -> bool:
+        try:
+            if isinstance(instance, (bytes, bytearray, str)):
+                self.model.model_validate_json(instance)
+            else:
+                self.model.model_validate(instance)
+            return True
+        except ValidationError:
+            return False
@@ -0,0 +1,245 @@
+"""
+Athena segmented append-only log.
+Length-prefixed, CRC32-checked records in size-capped segment files (optionally
+also rolled by age), written by one writer task with group commit. Used by the
+relay outbox and the CAP ledger.
+
+Record layout: <u32 length><u32 crc32(payload)><payload>, little endian.
+A short or CRC-mismatched record ends the scan of its segment (torn write).
+"""
+
+import asyncio, logging, os, struct, time, zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+HEADER = struct.Struct("<II")
+
+FSYNC_ALWAYS = "always"  # one fsync per record
+FSYNC_BATCH = "batch"    # group commit: one fsync per batch / interval
+FSYNC_OFF = "off"        # write + flush only, durability left to the OS
+
+
+@dataclass
+class FsyncPolicy:
+    mode: str = FSYNC_BATCH
+    batch_size: int = 64       # max records per group commit
+    interval_ms: float = 5.0   # max wait for a group to fill
+
+    @classmethod
+    def from_env(cls, prefix: str, batch_size: int = 64, interval_ms: float = 5.0) -> "FsyncPolicy":
+        policy = cls(
+            mode=os.getenv(f"{prefix}_FSYNC", FSYNC_BATCH).lower(),
+            batch_size=int(os.getenv(f"{prefix}_FSYNC_BATCH", str(batch_size))),
+            interval_ms=float(os.getenv(f"{prefix}_FSYNC_INTERVAL_MS", str(interval_ms))),
+        )
+        if policy.mode not in (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_OFF):
+            raise ValueError(f"Unknown {prefix}_FSYNC mode: {policy.mode}")
+        return policy
+
+
+def encode_record(payload: bytes) -> bytes:
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class SegmentLog:
+    """Append-only segmented log; every open() starts a fresh active segment."""
+
+    def __init__(self, directory: Path, prefix: str, segment_bytes: int = 16 << 20,
+                 policy: Optional[FsyncPolicy] = None, queue_size: int = 10000, roll_after_s: float = 0.0):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.segment_bytes = segment_bytes
+        self.roll_after_s = roll_after_s  # also roll a segment this old on the next write (0: size only)
+        self.policy = policy or FsyncPolicy()
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+        self.active_segment = 0
+        self._active_bytes = 0
+        self._active_opened = 0.0
+        self.records = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.fsync_total_ms = 0.0
+        self.dropped = 0
+        self.corrupt = 0
+
+    # --- Segment files ------------------------------------------------------
+    def _path(self, segment: int) -> Path:
+        return self.directory / f"{self.prefix}-{segment:08d}.log"
+
+    def segments(self) -> List[int]:
+        out = []
+        for p in self.directory.glob(f"{self.prefix}-*.log"):
+            try:
+                out.append(int(p.stem.rsplit("-", 1)[1]))
+            except ValueError:
+                continue
+        return sorted(out)
+
+    def remove_segment(self, segment: int):
+        if segment == self.active_segment:
+            raise ValueError("Cannot remove the active segment")
+        self._path(segment).unlink(missing_ok=True)
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.policy.mode != FSYNC_OFF:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        self.active_segment += 1
+        self._file = open(self._path(self.active_segment), "ab")
+        self._active_bytes = 0
+        self._active_opened = time.monotonic()
+        if self.policy.mode != FSYNC_OFF:
+            dir_fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    # --- Reading ------------------------------------------------------------
+    def read_segment(self, segment: int) -> Iterator[bytes]:
+        with open(self._path(segment), "rb") as f:
+            data = f.read()
+        pos, end = 0, len(data)
+        while pos + HEADER.size <= end:
+            length, crc = HEADER.unpack_from(data, pos)
+            payload = data[pos + HEADER.size: pos + HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                self.corrupt += 1
+                logging.warning(f"{self._path(segment).name}: torn or corrupt record at byte {pos}, "
+                                f"ignoring {end - pos} trailing byte(s)")
+                return
+            yield payload
+            pos += HEADER.size + length
+
+    def scan(self) -> Iterator[Tuple[int, bytes]]:
+        """Every intact record in segment order, as (segment, payload)."""
+        for segment in self.segments():
+            for payload in self.read_segment(segment):
+                yield segment, payload
+
+    # --- Lifecycle ----------------------------------------------------------
+    async def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = self.segments()
+        self.active_segment = existing[-1] if existing else 0
+        await asyncio.to_thread(self._roll)
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+        if self._file is not None:
+            self._file.flush()
+            if self.policy.mode != FSYNC_OFF:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    # --- Writing ------------------------------------------------------------
+    async def append(self, payload: bytes) -> int:
+        """Append and wait until the record is committed under the fsync policy.
+        Returns the segment the record landed in."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, future))
+        return await future
+
+    def try_append(self, payload: bytes) -> bool:
+        """Append without waiting for the commit; False if the writer is backed up."""
+        try:
+            self._queue.put_nowait((payload, None))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def append_nowait(self, payload: bytes) -> bool:
+        """try_append(), counting a refusal as dropped."""
+        if self.try_append(payload):
+            return True
+        self.dropped += 1
+        return False
+
+    async def _write_loop(self):
+        policy = self.policy
+        max_batch = 1 if policy.mode == FSYNC_ALWAYS else max(1, policy.batch_size)
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + policy.interval_ms / 1000
+            while len(batch) < max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.monotonic()
+                    if policy.mode != FSYNC_BATCH or remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                segments = await asyncio.to_thread(self._write_batch, [p for p, _ in batch])
+            except Exception as e:
+                logging.error(f"{self.prefix} log write failed: {e!r}")
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), segment in zip(batch, segments):
+                if future is not None and not future.done():
+                    future.set_result(segment)
+
+    def _write_batch(self, payloads: List[bytes]) -> List[int]:
+        segments = []
+        if self.roll_after_s and self._active_bytes and time.monotonic() - self._active_opened >= self.roll_after_s:
+            self._roll()
+        for payload in payloads:
+            record = encode_record(payload)
+            if self._active_bytes and self._active_bytes + len(record) > self.segment_bytes:
+                self._roll()
+            self._file.write(record)
+            self._active_bytes += len(record)
+            self.bytes_written += len(record)
+            segments.append(self.active_segment)
+        self._file.flush()
+        if self.policy.mode != FSYNC_OFF:
+            t0 = time.perf_counter()
+            os.fsync(self._file.fileno())
+            self.fsync_total_ms += (time.perf_counter() - t0) * 1000
+            self.fsyncs += 1
+        self.records += len(payloads)
+        self.batches += 1
+        return segments
+
+    # --- Metrics ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "fsync": self.policy.mode,
+            "segments": len(self.segments()),
+            "active_segment": self.active_segment,
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "mean_batch": round(self.records / self.batches, 2) if self.batches else 0.0,
+            "fsyncs": self.fsyncs,
+            "fsync_mean_ms": round(self.fsync_total_ms / self.fsyncs, 3) if self.fsyncs else 0.0,
+            "writer_backlog": self._queue.qsize() if self._queue is not None else 0,
+            "dropped": self.dropped,
+            "corrupt_records": self.corrupt,
+        }
@@ -0,0 +1,190 @@
+"""
+Athena request signing helpers.
+The HMAC is computed chunk by chunk while the body streams in, under a hard
+body-size limit, and rejected requests are tallied with what they cost us.
+Keys live in a KeyRing selected by X-Athena-Key-Id, reloadable without restart.
+"""
+
+import asyncio, hashlib, hmac, json, logging, os, time
+from pathlib import Path
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+
+from athena.metrics import CAP_REJECTED, CAP_REJECTED_BYTES, CAP_REJECTED_SECONDS
+
+
+class SignedBody(NamedTuple):
+    body: bytes
+    identity: str                      # what a retry must match in the idempotency cache
+    relay_signature: Optional[str]     # forwarded to the bridge; None when it doesn't cover body alone
+    encoding: Optional[str] = None     # Content-Encoding the body arrived in (body is decoded)
+    wire: Optional[bytes] = None       # the encoded bytes relay_signature covers, when it is relayed
+
+
+class BodyTooLarge(Exception):
+    """The request body exceeded the configured maximum."""
+
+    def __init__(self, max_bytes: int, bytes_read: int):
+        super().__init__(f"Request body exceeds {max_bytes} bytes.")
+        self.max_bytes, self.bytes_read = max_bytes, bytes_read
+
+
+async def read_signed(chunks: AsyncIterator[bytes], mac, max_bytes: int, timer=None,
+                      decoder=None) -> Tuple[bytes, str]:
+    """Buffer the body while updating mac (a fresh HMAC from KeyRing.mac); returns
+    (body, hex digest). Raises BodyTooLarge as soon as more than max_bytes have arrived.
+    HMAC time is reported to timer.add("hmac", seconds) when a StageTimer is given.
+    With a compression.Decoder (Content-Encoding), max_bytes and the HMAC apply to
+    the wire bytes and the returned body is the decoded one."""
+    parts, size, hmac_s = [], 0, 0.0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyTooLarge(max_bytes, size)
+        t0 = time.perf_counter()
+        mac.update(chunk)
+        hmac_s += time.perf_counter() - t0
+        if decoder is None:
+            parts.append(chunk)
+        else:
+            parts.extend(decoder.feed(chunk))
+    if decoder is not None:
+        decoder.finish()
+    t0 = time.perf_counter()
+    digest = mac.hexdigest()
+    if timer is not None:
+        timer.add("hmac", hmac_s + time.perf_counter() - t0)
+        if decoder is not None:
+            timer.add("decompress", decoder.seconds)
+    return b"".join(parts), digest
+
+
+def signature_matches(digest: str, received_sig: Optional[str]) -> bool:
+    # compare_digest raises TypeError on non-ASCII str; such a signature just doesn't match
+    return bool(received_sig) and received_sig.isascii() and hmac.compare_digest(digest, received_sig)
+
+
+# --- Key ring ---------------------------------------------------------------
+class _Key:
+    __slots__ = ("mac", "tenant", "verified")
+
+    def __init__(self, secret: bytes, tenant: Optional[str]):
+        self.mac = hmac.new(secret, digestmod=hashlib.sha256)  # keyed once, copied per request
+        self.tenant = tenant
+        self.verified = 0
+
+
+class KeyRing:
+    """key_id -> prepared HMAC state (and tenant).
+
+    ATHENA_SHARED_SECRET, when set, is the key "default". ATHENA_KEYRING_FILE
+    adds keys from {"keys": {"<key_id>": {"secret": "...", "tenant": "..."}}}
+    (a bare string is a secret without tenant); requests without X-Athena-Key-Id
+    use ATHENA_DEFAULT_KEY_ID ("default"). reload() rebuilds the ring and swaps
+    it in one assignment, so rotation is: add new key, move producers, drop old."""
+
+    def __init__(self, path: Optional[Path] = None, default_key_id: str = "default"):
+        self.path = path
+        self.default_key_id = default_key_id
+        self._keys: Dict[str, _Key] = {}
+        self._mtime = None
+        self.reloads = 0
+        self.reload_errors = 0
+        self.unknown_key_ids = 0
+
+    @classmethod
+    def from_env(cls) -> "KeyRing":
+        path = os.getenv("ATHENA_KEYRING_FILE")
+        ring = cls(Path(path) if path else None, os.getenv("ATHENA_DEFAULT_KEY_ID", "default"))
+        ring.reload()
+        return ring
+
+    def _read(self) -> Dict[str, _Key]:
+        keys = {}
+        secret = os.getenv("ATHENA_SHARED_SECRET", "")
+        if secret:
+            keys["default"] = _Key(secret.encode(), None)
+        if self.path is not None:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for key_id, entry in data.get("keys", {}).items():
+                if isinstance(entry, str):
+                    entry = {"secret": entry}
+                if not entry.get("secret"):
+                    raise ValueError(f"key {key_id!r} has no secret")
+                keys[key_id] = _Key(entry["secret"].encode(), entry.get("tenant"))
+        return keys
+
+    def reload(self) -> bool:
+        """Re-read the environment and key file; on error the current ring stays."""
+        try:
+            mtime = self.path.stat().st_mtime_ns if self.path is not None else None
+            keys = self._read()
+        except Exception as e:
+            self.reload_errors += 1
+            logging.error(f"Key ring reload failed, keeping {len(self._keys)} key(s): {e}")
+            return False
+        for key_id, key in keys.items():
+            if key_id in self._keys:
+                key.verified = self._keys[key_id].verified
+        self._keys, self._mtime = keys, mtime
+        self.reloads += 1
+        logging.info(f"Key ring loaded: {len(keys)} key(s)")
+        return True
+
+    async def watch(self, interval_s: float):
+        """Reload whenever the key file's mtime changes."""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                changed = self.path.stat().st_mtime_ns != self._mtime
+            except OSError:
+                changed = False
+            if changed:
+                self.reload()
+
+    def __contains__(self, key_id: str) -> bool:
+        return key_id in self._keys
+
+    def mac(self, key_id: Optional[str]) -> Tuple[Optional[object], Optional[str]]:
+        """(fresh HMAC for the key, tenant); (None, None) for an unknown key id."""
+        key = self._keys.get(key_id or self.default_key_id)
+        if key is None:
+            self.unknown_key_ids += 1
+            return None, None
+        return key.mac.copy(), key.tenant
+
+    def verified(self, key_id: Optional[str]):
+        key = self._keys.get(key_id or self.default_key_id)
+        if key is not None:
+            key.verified += 1
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "default_key_id": self.default_key_id,
+            "file": str(self.path) if self.path is not None else None,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "unknown_key_ids": self.unknown_key_ids,
+            "verified": {key_id: key.verified for key_id, key in self._keys.items()},
+        }
+
+
+class RejectionStats:
+    """Rejected requests per reason, with body bytes read and time spent on them;
+    the same totals go to Prometheus."""
+
+    def __init__(self):
+        self.rejected = {}
+
+    def record(self, reason: str, bytes_read: int, started: float):
+        seconds = time.perf_counter() - started
+        entry = self.rejected.setdefault(reason, {"count": 0, "bytes_read": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["bytes_read"] += bytes_read
+        entry["seconds"] += seconds
+        CAP_REJECTED.labels(reason).inc()
+        CAP_REJECTED_BYTES.labels(reason).inc(bytes_read)
+        CAP_REJECTED_SECONDS.labels(reason).inc(seconds)
+
+    def stats(self) -> dict:
+        return {reason: {**entry, "seconds": round(entry["seconds"], 6)} for reason, entry in self.rejected.items()}
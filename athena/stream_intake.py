@@ -0,0 +1,73 @@
+"""
+Athena streaming intake helpers for /cap/stream.
+Splits a request body into NDJSON lines as it arrives, with bounded memory,
+and a streaming response that can answer while the upload is still running.
+"""
+
+import re
+from typing import AsyncIterator, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+_SIGNATURE = re.compile(rb"[0-9a-fA-F]{64}")
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator reads the request itself.
+    Starlette's version listens for http.disconnect on receive() for ASGI < 2.4
+    servers, which would swallow the request body the iterator is reading."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Yield (line_number, line) for each non-blank line, 1-based.
+    A line longer than max_line_bytes is yielded as None and skipped to its newline,
+    so memory stays at one line plus one chunk however long the stream is."""
+    buffer = bytearray()
+    line_no = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if oversized:
+                oversized = False
+                yield line_no, None
+            else:
+                buffer += chunk[start:end]
+                if len(buffer) > max_line_bytes:
+                    yield line_no, None
+                elif buffer.strip():
+                    yield line_no, bytes(buffer).strip()
+                buffer.clear()
+            start = end + 1
+    if oversized:
+        yield line_no + 1, None
+    elif buffer.strip():
+        yield line_no + 1, bytes(buffer).strip()
+
+
+def split_signed_line(line: bytes) -> Tuple[Optional[str], bytes]:
+    """Lines are "<hex HMAC-SHA256 of the CAP>\\t<CAP JSON>"; returns (signature, cap_bytes).
+    The signature is None unless it is exactly 64 hex digits, so a garbled field
+    fails that line's check instead of reaching compare_digest."""
+    signature, tab, cap = line.partition(b"\t")
+    if not tab:
+        return None, line
+    signature = signature.strip()
+    if not _SIGNATURE.fullmatch(signature):
+        return None, cap
+    return signature.decode("ascii"), cap
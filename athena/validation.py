@@ -0,0 +1,115 @@
+"""
+Athena CAP validator registry.
+Builds one Draft 2020-12 validator (with format checking) per schema hash and
+reuses it for every call, instead of re-checking the metaschema per request.
+"""
+
+import hashlib, json, logging, threading, time
+from pathlib import Path
+from typing import Optional
+
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
+
+
+# --- Hashing ----------------------------------------------------------------
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def schema_sha256(schema: dict) -> str:
+    """Hash of a schema that was not loaded from disk (canonical JSON form)."""
+    return sha256_bytes(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+
+# --- Cached validator -------------------------------------------------------
+class TimedValidator:
+    """Per-call timing bookkeeping shared by every CAP validator flavour."""
+
+    kind = "base"
+    single_pass = False  # True when check() parses and validates raw bytes itself
+
+    def __init__(self, schema: dict, schema_hash: str, build_ms: float):
+        self.schema = schema
+        self.schema_hash = schema_hash
+        self.build_ms = build_ms
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def _record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "schema_hash": self.schema_hash,
+            "build_ms": round(self.build_ms, 3),
+            "calls": self.calls,
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+        }
+
+
+class CAPValidator(TimedValidator):
+    """Prebuilt jsonschema validator for one schema, with build and per-call timings."""
+
+    kind = "jsonschema"
+
+    def __init__(self, schema: dict, schema_hash: str):
+        t0 = time.perf_counter()
+        Draft202012Validator.check_schema(schema)
+        self._validator = Draft202012Validator(
+            schema, format_checker=Draft202012Validator.FORMAT_CHECKER
+        )
+        super().__init__(schema, schema_hash, (time.perf_counter() - t0) * 1000)
+
+    def validate(self, instance):
+        """Raise the best-matching ValidationError, same as jsonschema.validate()."""
+        t0 = time.perf_counter()
+        try:
+            error = best_match(self._validator.iter_errors(instance))
+        finally:
+            self._record((time.perf_counter() - t0) * 1000)
+        if error is not None:
+            raise error
+
+    def is_valid(self, instance) -> bool:
+        return self._validator.is_valid(instance)
+
+
+# --- Registry ---------------------------------------------------------------
+class ValidatorRegistry:
+    """One CAPValidator per schema hash, built on first use and kept for the process."""
+
+    def __init__(self):
+        self._validators = {}
+        self._lock = threading.Lock()
+
+    def get(self, schema: dict, schema_hash: Optional[str] = None) -> CAPValidator:
+        key = schema_hash or schema_sha256(schema)
+        validator = self._validators.get(key)
+        if validator is None:
+            with self._lock:
+                validator = self._validators.get(key)
+                if validator is None:
+                    validator = CAPValidator(schema, key)
+                    self._validators[key] = validator
+                    logging.info(f"Validator built for schema {key[:12]} in {validator.build_ms:.1f} ms")
+        return validator
+
+    def load(self, path: Path) -> CAPValidator:
+        """Load a schema file and return its validator, keyed by the file's SHA256."""
+        raw = Path(path).read_bytes()
+        return self.get(json.loads(raw), sha256_bytes(raw))
+
+    def stats(self) -> dict:
+        return {key: v.stats() for key, v in self._validators.items()}
+
+
+VALIDATORS = ValidatorRegistry()
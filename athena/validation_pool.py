@@ -0,0 +1,179 @@
+"""
+Athena CAP validation pool.
+Small workloads are checked inline; large batches are split into chunks and
+fanned out to a process pool whose workers load the (compiled) CAP validator
+once at start-up. Single CAPs above offload_min_bytes go to the same pool, so
+one huge payload does not stall the event loop while it parses and validates.
+Worker processes (~40 MB RSS each, with jsonschema and the compiled validator
+loaded) are spawned on first use, one per concurrent task, so an instance that
+never sees a large CAP or batch never pays for them; CAP_POOL_EAGER=1 spawns
+them all at start-up instead, for a fast first offload.
+"""
+
+import asyncio, logging, multiprocessing, os, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional
+
+from jsonschema import ValidationError
+
+from athena import codec
+from athena.codegen import SCHEMA_NAME, load_preferred_validator
+from athena.models import CAPPayload
+from athena.validation import VALIDATORS, TimedValidator
+
+
+def check_cap(item, validator: TimedValidator, media: str = codec.JSON) -> dict:
+    """Parse (when given bytes, in the given media type) and validate one CAP, with
+    /cap's status codes.
+    Returns {"status": 200, "cap_id", "domain", "context_mode"} or {"status": 4xx, "error"}."""
+    if media != codec.JSON and isinstance(item, (bytes, bytearray)):
+        try:
+            item = codec.decode_body(item, media)
+        except Exception as e:
+            return {"status": 400, "error": f"Invalid CAP payload: {e}"}
+    if validator.single_pass:
+        return validator.check(item)
+    try:
+        data = codec.loads(item) if isinstance(item, (bytes, bytearray, str)) else item
+        CAPPayload(**data)
+        validator.validate(data)
+    except ValidationError as ve:
+        return {"status": 422, "error": f"CAP schema validation error: {ve.message}"}
+    except Exception as e:
+        return {"status": 400, "error": f"Invalid CAP payload: {e}"}
+    return {"status": 200, "cap_id": data.get("cap_id"), "domain": data.get("domain"),
+            "context_mode": data.get("context_mode")}
+
+
+# --- Worker side ------------------------------------------------------------
+_WORKER_VALIDATOR: Optional[TimedValidator] = None
+
+def _init_worker(base_dir: str):
+    global _WORKER_VALIDATOR
+    base = Path(base_dir)
+    reference = VALIDATORS.load(base / "schemas" / SCHEMA_NAME)
+    _WORKER_VALIDATOR = load_preferred_validator(base, reference)
+
+def _check_chunk(items: list) -> List[dict]:
+    return [check_cap(item, _WORKER_VALIDATOR) for item in items]
+
+def _check_one(item: bytes, media: str) -> dict:
+    return check_cap(item, _WORKER_VALIDATOR, media)
+
+
+# --- Pool -------------------------------------------------------------------
+class ValidationPool:
+    """Inline below parallel_min_items (batches) or offload_min_bytes (single CAPs),
+    process pool above (when workers > 0). At most max_offloads single CAPs are
+    queued for or held by workers; further large ones wait for a slot."""
+
+    def __init__(self, base_dir: Path, validator: TimedValidator, workers: int = 2,
+                 parallel_min_items: int = 64, offload_min_bytes: int = 256 << 10,
+                 max_offloads: int = 0, eager: bool = False):
+        self.base_dir = Path(base_dir)
+        self.validator = validator
+        self.workers = workers
+        self.parallel_min_items = parallel_min_items
+        self.offload_min_bytes = offload_min_bytes
+        self.max_offloads = max_offloads or 2 * max(1, workers)
+        self.eager = eager
+        self._offload_slots = asyncio.Semaphore(self.max_offloads)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.inline_items = 0
+        self.pooled_items = 0
+        self.pooled_calls = 0
+        self.pooled_total_ms = 0.0
+        self.offloaded = 0
+        self.offload_waits = 0
+        self.offload_total_ms = 0.0
+
+    @classmethod
+    def from_env(cls, base_dir: Path, validator: TimedValidator) -> "ValidationPool":
+        return cls(
+            base_dir, validator,
+            workers=int(os.getenv("CAP_POOL_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            parallel_min_items=int(os.getenv("CAP_BATCH_PARALLEL_MIN", "64")),
+            offload_min_bytes=int(os.getenv("CAP_OFFLOAD_MIN_BYTES", str(256 << 10))),
+            max_offloads=int(os.getenv("CAP_OFFLOAD_MAX_PENDING", "0")),
+            eager=os.getenv("CAP_POOL_EAGER", "0") == "1",
+        )
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            # spawn: workers import only athena.*, never the running app or its event loop;
+            # the executor starts them as tasks arrive (spawn-context pools grow on demand)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(str(self.base_dir),))
+            if self.eager:
+                for _ in range(self.workers):
+                    self._executor.submit(int)  # spawn workers now, not on the first large batch
+            logging.info(f"Validation pool started (up to {self.workers} worker process(es), "
+                         f"{'spawned now' if self.eager else 'spawned on first use'})")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def check_large(self, body: bytes, media: str = codec.JSON) -> Optional[dict]:
+        """check_cap() in a worker for a body of at least offload_min_bytes; None for
+        smaller bodies (or no pool), which the caller checks inline itself."""
+        if self._executor is None or len(body) < self.offload_min_bytes:
+            return None
+        if self._offload_slots.locked():
+            self.offload_waits += 1
+        async with self._offload_slots:
+            t0 = time.perf_counter()
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, _check_one, body, media)
+            except BrokenProcessPool as e:
+                logging.error(f"Validation pool broken, restarting and checking inline: {e}")
+                self.close()
+                self.start()
+                self.inline_items += 1
+                return check_cap(body, self.validator, media)
+            self.offloaded += 1
+            self.offload_total_ms += (time.perf_counter() - t0) * 1000
+            return result
+
+    async def check_many(self, items: list) -> List[dict]:
+        if self._executor is None or len(items) < self.parallel_min_items:
+            self.inline_items += len(items)
+            return [check_cap(item, self.validator) for item in items]
+
+        t0 = time.perf_counter()
+        size = -(-len(items) // (self.workers * 2))
+        chunks = [items[i:i + size] for i in range(0, len(items), size)]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(*(loop.run_in_executor(self._executor, _check_chunk, chunk)
+                                             for chunk in chunks))
+        except BrokenProcessPool as e:
+            logging.error(f"Validation pool broken, restarting and checking inline: {e}")
+            self.close()
+            self.start()
+            self.inline_items += len(items)
+            return [check_cap(item, self.validator) for item in items]
+        self.pooled_calls += 1
+        self.pooled_items += len(items)
+        self.pooled_total_ms += (time.perf_counter() - t0) * 1000
+        return [r for chunk in results for r in chunk]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "processes": len(self._executor._processes or ()) if self._executor is not None else 0,
+            "parallel_min_items": self.parallel_min_items,
+            "inline_items": self.inline_items,
+            "pooled_items": self.pooled_items,
+            "pooled_calls": self.pooled_calls,
+            "pooled_mean_ms": round(self.pooled_total_ms / self.pooled_calls, 3) if self.pooled_calls else 0.0,
+            "offload_min_bytes": self.offload_min_bytes,
+            "max_offloads": self.max_offloads,
+            "offloaded": self.offloaded,
+            "offload_waits": self.offload_waits,
+            "offload_mean_ms": round(self.offload_total_ms / self.offloaded, 3) if self.offloaded else 0.0,
+        }
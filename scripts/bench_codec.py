@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON codec benchmark over realistic CAP sizes.
+Times decode (request body) and encode (response / relay payload) for every
+installed backend of athena.codec, checks they round-trip to the same object,
+and reports the canonical() form's cost next to them.
+
+    python scripts/bench_codec.py --rounds 2000
+"""
+
+import argparse, random, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena import codec
+from cap_fuzz import make_cap
+
+SIZES = [("cap_record.json", dict(evidence=1), 1.0),
+         ("evidence=50 trace=50", dict(evidence=50, trace=50, detections=10, signals=10), 0.1),
+         ("evidence=1000 trace=1000", dict(evidence=1000, trace=1000, detections=200, signals=200), 0.005)]
+
+
+def _time(fn, arg, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000, help="rounds for the smallest CAP (scaled down for larger)")
+    args = parser.parse_args()
+
+    backends = {}
+    for name, load in codec._BACKENDS.items():
+        try:
+            backends[name] = load()
+        except ImportError:
+            print(f"⚠️ {name} not installed")
+    print(f"🔧 athena.codec selected: {codec.NAME}")
+    print(f"\n⏱ µs per CAP{'':<21}" + "".join(f"{name + ' dec':>13}{name + ' enc':>13}" for name in backends)
+          + f"{'canonical':>13}")
+
+    for label, size, scale in SIZES:
+        cap = make_cap(**size, rng=random.Random(1))
+        body = codec.canonical(cap)
+        rounds = max(3, int(args.rounds * scale))
+        row = f"{label} ({len(body) / 1024:,.0f} KiB)"
+        cells = []
+        for name, (loads, dumps) in backends.items():
+            if loads(dumps(cap)) != cap or loads(body) != cap:
+                print(f"❌ {name} does not round-trip {label}")
+                sys.exit(1)
+            cells.append(f"{_time(loads, body, rounds):>13.1f}{_time(dumps, cap, rounds):>13.1f}")
+        print(f"{row:<33}" + "".join(cells) + f"{_time(codec.canonical, cap, rounds):>13.1f}")
+    print("✅ Every backend round-trips every CAP size.")
+
+
+if __name__ == "__main__":
+    main()
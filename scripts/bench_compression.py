@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAP body compression benchmark: ratio and CPU cost per Content-Encoding.
+For realistic CAP sizes, reports compressed bytes, ratio, encode time (relay
+side) and incremental decode time through athena.compression.Decoder fed in
+64 KiB chunks, as /cap reads them (zstd is skipped when zstandard is missing).
+
+    python scripts/bench_compression.py --rounds 500
+"""
+
+import argparse, json, random, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena import compression
+from cap_fuzz import make_cap
+
+SIZES = [("cap_record.json", dict(evidence=1), 1.0),
+         ("evidence=50 trace=50", dict(evidence=50, trace=50, detections=10, signals=10), 0.1),
+         ("evidence=1000 trace=1000", dict(evidence=1000, trace=1000, detections=200, signals=200), 0.005)]
+CHUNK = 64 << 10
+
+
+def _decode(wire: bytes, encoding: str) -> bytes:
+    decoder = compression.Decoder(encoding)
+    out = b"".join(piece for i in range(0, len(wire), CHUNK) for piece in decoder.feed(wire[i:i + CHUNK]))
+    decoder.finish()
+    return out
+
+
+def _time(fn, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=500, help="rounds for the smallest CAP (scaled down for larger)")
+    parser.add_argument("--levels", default="1,default", help="comma-separated compression levels")
+    args = parser.parse_args()
+
+    levels = [None if level == "default" else int(level) for level in args.levels.split(",")]
+    if "zstd" not in compression.supported():
+        print("⚠️ zstd skipped (zstandard not installed)")
+    print(f"{'payload':<26}{'encoding':<12}{'bytes':>10}{'ratio':>8}{'encode µs':>12}{'decode µs':>12}{'MB/s dec':>10}")
+    for label, size, scale in SIZES:
+        body = json.dumps(make_cap(**size, rng=random.Random(1))).encode("utf-8")
+        rounds = max(3, int(args.rounds * scale))
+        print(f"{label:<26}{'identity':<12}{len(body):>10,}")
+        for encoding in compression.supported():
+            for level in levels:
+                wire = compression.encode(body, encoding, level)
+                if _decode(wire, encoding) != body:
+                    print(f"❌ {encoding} does not round-trip {label}")
+                    sys.exit(1)
+                encode_us = _time(lambda: compression.encode(body, encoding, level), rounds)
+                decode_us = _time(lambda: _decode(wire, encoding), rounds)
+                name = encoding if level is None else f"{encoding}-{level}"
+                print(f"{'':<26}{name:<12}{len(wire):>10,}{len(body) / len(wire):>7.1f}x"
+                      f"{encode_us:>12.1f}{decode_us:>12.1f}{len(body) / decode_us:>10.0f}")
+    print("✅ Every encoding round-trips every CAP size.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAP wire format benchmark: JSON vs MessagePack vs CBOR.
+For realistic CAP sizes, reports encoded payload bytes and decode / encode time
+per format through athena.codec (formats whose library is missing are skipped).
+
+    python scripts/bench_formats.py --rounds 2000
+"""
+
+import argparse, random, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena import codec
+from cap_fuzz import make_cap
+
+SIZES = [("cap_record.json", dict(evidence=1), 1.0),
+         ("evidence=50 trace=50", dict(evidence=50, trace=50, detections=10, signals=10), 0.1),
+         ("evidence=1000 trace=1000", dict(evidence=1000, trace=1000, detections=200, signals=200), 0.005)]
+
+
+def _time(fn, arg, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000, help="rounds for the smallest CAP (scaled down for larger)")
+    args = parser.parse_args()
+
+    formats = [media for media in (codec.JSON, codec.MSGPACK, codec.CBOR) if codec.available(media)]
+    for media in {codec.MSGPACK, codec.CBOR} - set(formats):
+        print(f"⚠️ {media} skipped (library not installed)")
+    print(f"🔧 JSON backend: {codec.NAME}")
+    print(f"\n{'payload':<26}{'format':<22}{'bytes':>10}{'vs JSON':>9}{'decode µs':>11}{'encode µs':>11}")
+    for label, size, scale in SIZES:
+        cap = make_cap(**size, rng=random.Random(1))
+        rounds = max(3, int(args.rounds * scale))
+        json_bytes = None
+        for media in formats:
+            body = codec.encode_body(cap, media)
+            if codec.decode_body(body, media) != cap:
+                print(f"❌ {media} does not round-trip {label}")
+                sys.exit(1)
+            json_bytes = json_bytes or len(body)
+            decode_us = _time(lambda b: codec.decode_body(b, media), body, rounds)
+            encode_us = _time(lambda c: codec.encode_body(c, media), cap, rounds)
+            print(f"{label:<26}{media:<22}{len(body):>10,}{len(body) / json_bytes:>8.0%}"
+                  f"{decode_us:>11.1f}{encode_us:>11.1f}")
+    print("✅ Every format round-trips every CAP size.")
+
+
+if __name__ == "__main__":
+    main()
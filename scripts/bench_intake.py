@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Intake throughput benchmark: single /cap vs /cap/batch.
+Starts the app under uvicorn (relay disabled unless BRIDGE_URL is set), signs
+fuzzed valid CAPs and reports items/s for one CAP per request and for batches.
+
+    python scripts/bench_intake.py --caps 5000 --batch-sizes 10,100,1000
+"""
+
+import argparse, asyncio, hashlib, hmac, json, os, random, socket, subprocess, sys, time
+from pathlib import Path
+
+import aiohttp
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from cap_fuzz import make_cap
+
+SECRET = "bench-secret"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    env = {**os.environ, "ATHENA_SHARED_SECRET": SECRET, "IDEMPOTENCY_CACHE_SIZE": "0", **env}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_healthy(url: str, timeout_s: float = 30.0):
+    deadline = time.monotonic() + timeout_s
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/healthz") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become healthy")
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+async def bench(url: str, caps: list, batch_size: int, concurrency: int) -> float:
+    if batch_size:
+        bodies = [b"\n".join(caps[i:i + batch_size]) + b"\n" for i in range(0, len(caps), batch_size)]
+        path, content_type = "/cap/batch", "application/x-ndjson"
+    else:
+        bodies, path, content_type = caps, "/cap", "application/json"
+    pending = iter(bodies)
+    failures = 0
+
+    async def sender(session):
+        nonlocal failures
+        for body in pending:
+            headers = {"Content-Type": content_type, "X-Athena-Signature": sign(body)}
+            async with session.post(url + path, data=body, headers=headers) as resp:
+                await resp.read()
+                failures += resp.status != 200
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    if failures:
+        print(f"⚠️ {failures} request(s) failed")
+    return len(caps) / elapsed
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    caps = [json.dumps(make_cap(rng.randint(1, 4), rng.randint(1, 8), rng.randint(0, 4),
+                                rng.randint(0, 4), rng)).encode("utf-8") for _ in range(args.caps)]
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = start_server(port, {"CAP_POOL_WORKERS": str(args.workers), "CAP_POOL_EAGER": "1"})
+    try:
+        await wait_healthy(url)
+        print(f"⏱ {args.caps} CAPs, {args.concurrency} concurrent senders, {args.workers} pool worker(s)")
+        print(f"{'mode':<18}{'items/s':>10}")
+        for size in [0] + [int(s) for s in args.batch_sizes.split(",")]:
+            label = "single /cap" if not size else f"batch {size}"
+            print(f"{label:<18}{await bench(url, caps, size, args.concurrency):>10.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--caps", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="10,100,1000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAP ledger benchmark at 1k / 10k / 100k records.
+Concurrent producers append validated CAPs the way /cap does; reports what an
+append costs the request (write-behind, and LEDGER_SYNC=1 commit waits), the
+sustained rate to disk per fsync policy, and a full read-back with CRC checks.
+
+    python scripts/bench_ledger.py --records 1000,10000,100000 --producers 64
+"""
+
+import argparse, asyncio, statistics, sys, tempfile, time, uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.ledger import CAPLedger
+from athena.segment_log import FsyncPolicy, SegmentLog
+
+POLICIES = [
+    ("batch 64 / 5ms", FsyncPolicy("batch", 64, 5), False),
+    ("batch 256 / 10ms", FsyncPolicy("batch", 256, 10), False),
+    ("off", FsyncPolicy("off"), False),
+    ("sync, batch 64 / 5ms", FsyncPolicy("batch", 64, 5), True),
+]
+
+
+async def run(policy: FsyncPolicy, sync: bool, records: int, producers: int, body: bytes,
+              segment_bytes: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = CAPLedger(SegmentLog(Path(tmp), "ledger", segment_bytes=segment_bytes, policy=policy), sync=sync)
+        await ledger.open()
+        latencies = []
+        per_producer = records // producers
+
+        async def producer():
+            for _ in range(per_producer):
+                t0 = time.perf_counter()
+                await ledger.append(str(uuid.uuid4()), body)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                await asyncio.sleep(0)  # a real handler yields between requests
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(producer() for _ in range(producers)))
+        appended = time.perf_counter() - t0
+        await ledger.close()  # drains the writer: everything is on disk after this
+        committed = time.perf_counter() - t0
+        stats = ledger.stats()
+
+        t0 = time.perf_counter()
+        read_back = sum(1 for entry in ledger.entries() if entry.body == body)
+        scan = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "records": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "max": latencies[-1],
+        "append_rate": len(latencies) / appended,
+        "disk_rate": len(latencies) / committed,
+        "segments": stats["segments"],
+        "mean_batch": stats["mean_batch"],
+        "backpressured": stats["backpressured"],
+        "read_back": read_back,
+        "corrupt": stats["corrupt_records"],
+        "scan_rate": read_back / scan if scan else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", default="1000,10000,100000")
+    parser.add_argument("--producers", type=int, default=64)
+    parser.add_argument("--segment-bytes", type=int, default=16 << 20)
+    parser.add_argument("--sync-max", type=int, default=10000, help="skip the sync row above this many records")
+    args = parser.parse_args()
+    body = (BASE_DIR / "cap_record.json").read_bytes()
+
+    print(f"⏱ CAP ledger: {len(body)} B CAPs, {args.producers} concurrent producers, "
+          f"{args.segment_bytes >> 20} MiB segments")
+    print(f"{'records':>8}  {'policy':<22}{'p50 ms':>8}{'p99 ms':>8}{'max ms':>8}{'append/s':>10}"
+          f"{'disk/s':>9}{'segs':>6}{'batch':>7}{'backpr':>8}{'scan/s':>9}")
+    failures = 0
+    for records in (int(n) for n in args.records.split(",")):
+        for label, policy, sync in POLICIES:
+            if sync and records > args.sync_max:
+                continue
+            r = asyncio.run(run(policy, sync, records, args.producers, body, args.segment_bytes))
+            print(f"{records:>8,}  {label:<22}{r['p50']:>8.3f}{r['p99']:>8.3f}{r['max']:>8.2f}{r['append_rate']:>10.0f}"
+                  f"{r['disk_rate']:>9.0f}{r['segments']:>6}{r['mean_batch']:>7.1f}{r['backpressured']:>8}"
+                  f"{r['scan_rate']:>9.0f}")
+            if r["read_back"] != r["records"] or r["corrupt"]:
+                print(f"❌ read back {r['read_back']} of {r['records']} records ({r['corrupt']} corrupt)")
+                failures += 1
+    if not failures:
+        print("✅ Every appended CAP read back intact.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caller-side cost of a log line: synchronous StreamHandler vs the queue pipeline.
+Logs N "CAP received"-style lines the way the event loop does and reports
+µs per call, plus records dropped and sampled out by the pipeline. --sink-us
+makes every write that slow, like stdout into a congested pipe.
+
+    python scripts/bench_logging.py --lines 20000 --sink-us 50 --sample INFO=10
+"""
+
+import argparse, logging, os, sys, time, uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.log_pipeline import JsonFormatter, TEXT_FORMAT, configure_logging
+
+
+class SlowSink:
+    """File wrapper whose writes block (GIL released) for sink_us, like a congested pipe."""
+
+    def __init__(self, f, sink_us: float):
+        self.f, self.sink_s = f, sink_us / 1e6
+
+    def write(self, data):
+        if self.sink_s:
+            time.sleep(self.sink_s)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def burst(lines: int) -> float:
+    trace_id = str(uuid.uuid4())
+    t0 = time.perf_counter()
+    for i in range(lines):
+        logging.info("[TRACE %s] CAP received: %s", trace_id, f"CAP-{i}",
+                     extra={"trace_id": trace_id, "sample": True})
+    return (time.perf_counter() - t0) / lines * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--format", choices=["text", "json"], default="json")
+    parser.add_argument("--sample", default="", help='e.g. "INFO=10" keeps 1 in 10 sampled INFO lines')
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--sink-us", type=float, default=0.0, help="simulated cost of each write")
+    args = parser.parse_args()
+
+    # Write to a file so the terminal isn't the bottleneck being measured
+    out = SlowSink(open(os.path.join(os.getenv("TMPDIR", "/tmp"), "athena_bench_logging.log"), "w"), args.sink_us)
+    sys.stderr = out
+    os.environ.update(ATHENA_LOG_FORMAT=args.format, ATHENA_LOG_SAMPLE=args.sample,
+                      ATHENA_LOG_QUEUE_SIZE=str(args.queue_size))
+
+    root = logging.getLogger()
+    handler = logging.StreamHandler(out)
+    handler.setFormatter(JsonFormatter() if args.format == "json" else logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    sync_us = burst(args.lines)
+    root.removeHandler(handler)
+
+    pipeline = configure_logging(logging.INFO)
+    async_us = burst(args.lines)
+    t0 = time.perf_counter()
+    pipeline.stop()
+    drain_s = time.perf_counter() - t0
+    stats = pipeline.stats()
+    sys.stderr = sys.__stderr__
+    print(f"⏱ {args.lines} lines, {args.format}, sample '{args.sample or 'off'}', queue {args.queue_size}, "
+          f"sink {args.sink_us} µs/write")
+    print(f"  synchronous handler : {sync_us:6.2f} µs/call")
+    print(f"  queue pipeline      : {async_us:6.2f} µs/call (writer drained the rest in {drain_s:.2f}s)")
+    print(f"  enqueued {stats['enqueued']}, dropped {stats['dropped']}, sampled out {stats['sampled_out']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event-loop lag under large CAPs, validated inline vs in the validation pool.
+While a few senders post multi-MB CAPs to /cap, a probe sends small CAPs one at
+a time; its latency is what every other connection waits while a large payload
+parses and validates. Runs once with offloading off, once with it on.
+
+    python scripts/bench_loop_lag.py --trace-steps 20000 --seconds 10
+"""
+
+import argparse, asyncio, json, random, statistics, sys, time
+from pathlib import Path
+
+import aiohttp
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from bench_intake import free_port, sign, start_server, wait_healthy
+from cap_fuzz import make_cap
+
+
+async def post(session, url: str, body: bytes) -> int:
+    headers = {"Content-Type": "application/json", "X-Athena-Signature": sign(body)}
+    async with session.post(url + "/cap", data=body, headers=headers) as resp:
+        await resp.read()
+        return resp.status
+
+
+async def measure(url: str, large: bytes, small: list, senders: int, seconds: float) -> dict:
+    deadline = time.perf_counter() + seconds
+    counts = {"large": 0, "failed": 0}
+    probes = []
+
+    async def sender(session):
+        while time.perf_counter() < deadline:
+            status = await post(session, url, large)
+            counts["large" if status == 200 else "failed"] += 1
+
+    async def probe(session):
+        i = 0
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            status = await post(session, url, small[i % len(small)])
+            probes.append((time.perf_counter() - t0) * 1000)
+            counts["failed"] += status != 200
+            i += 1
+            await asyncio.sleep(0.01)
+
+    connector = aiohttp.TCPConnector(limit=senders + 1)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(probe(session), *(sender(session) for _ in range(senders)))
+    probes.sort()
+    return {**counts, "probes": len(probes), "p50": statistics.median(probes),
+            "p99": probes[int(len(probes) * 0.99) - 1], "max": probes[-1]}
+
+
+async def run(args):
+    rng = random.Random(3)
+    large = json.dumps(make_cap(args.evidence, args.trace_steps, 4, 4, rng)).encode("utf-8")
+    small = [json.dumps(make_cap(2, 2, 1, 1, rng)).encode("utf-8") for _ in range(50)]
+    print(f"⏱ large CAP {len(large) / 1e6:.1f} MB x {args.senders} sender(s), small-CAP probe every 10 ms, "
+          f"{args.seconds:.0f}s per mode, {args.workers} pool worker(s)")
+    print(f"{'validation':<12}{'large/s':>9}{'probe p50':>11}{'p99':>9}{'max':>9}  (ms)")
+    modes = [("inline", {"CAP_OFFLOAD_MIN_BYTES": str(1 << 40)}),
+             ("pool", {"CAP_OFFLOAD_MIN_BYTES": str(args.offload_min_bytes)})]
+    for label, env in modes:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(port, {"CAP_POOL_WORKERS": str(args.workers), "CAP_POOL_EAGER": "1",
+                                     "CAP_MAX_BODY_BYTES": str(64 << 20), **env})
+        try:
+            await wait_healthy(url)
+            r = await measure(url, large, small, args.senders, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{label:<12}{r['large'] / args.seconds:>9.1f}{r['p50']:>11.1f}{r['p99']:>9.1f}{r['max']:>9.1f}"
+              + (f"  ⚠️ {r['failed']} failed" if r["failed"] else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trace-steps", type=int, default=20000, help="CAP_EXT13 trace length of the large CAP")
+    parser.add_argument("--evidence", type=int, default=2000)
+    parser.add_argument("--senders", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--offload-min-bytes", type=int, default=256 << 10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
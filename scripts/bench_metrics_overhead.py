@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hot-path cost of the /cap Prometheus instrumentation.
+Times the per-request metric work in isolation (stage marks, histogram
+observations, result counter), then /cap throughput with metrics off, with the
+/cap stage metrics, and with the per-route HTTP middleware on top.
+
+    python scripts/bench_metrics_overhead.py --requests 100000 --caps 3000
+"""
+
+import argparse, asyncio, json, random, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.metrics import CAP_RESULTS, STAGES, StageTimer
+from bench_intake import bench, free_port, start_server, wait_healthy
+from cap_fuzz import make_cap
+
+
+def micro(requests: int) -> float:
+    series = CAP_RESULTS.labels("200", "Research", "Advisor")
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        timer = StageTimer()
+        timer.add("hmac", 1e-6)
+        for stage in STAGES:
+            if stage != "hmac":
+                timer.mark(stage)
+        timer.observe()
+        series.inc()
+    return (time.perf_counter() - t0) / requests * 1e6
+
+
+async def end_to_end(caps: list, concurrency: int, env: dict) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = start_server(port, env)
+    try:
+        await wait_healthy(url)
+        await bench(url, caps[:200], 0, concurrency)  # warm-up
+        return await bench(url, caps, 0, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--caps", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"⏱ Metric work per request: {micro(args.requests):.2f} µs ({args.requests} simulated requests)")
+    rng = random.Random(7)
+    caps = [json.dumps(make_cap(rng.randint(1, 4), rng.randint(1, 8), rng.randint(0, 4),
+                                rng.randint(0, 4), rng)).encode("utf-8") for _ in range(args.caps)]
+    modes = [("off", {"ATHENA_METRICS": "0"}),
+             ("stages", {"ATHENA_METRICS": "1"}),
+             ("stages+http", {"ATHENA_METRICS": "1", "ATHENA_METRICS_HTTP": "1"})]
+    print(f"{'metrics':<14}{'CAPs/s':>10}{'overhead':>10}")
+    baseline = None
+    for label, env in modes:
+        rate = asyncio.run(end_to_end(caps, args.concurrency, env))
+        baseline = baseline or rate
+        print(f"{label:<14}{rate:>10.0f}{(1 - rate / baseline) * 100:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
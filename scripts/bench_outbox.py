@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relay outbox intake benchmark.
+Sustained put() throughput and commit latency for each fsync policy,
+with concurrent producers the way /cap calls it.
+
+    python scripts/bench_outbox.py --records 5000 --producers 64
+"""
+
+import argparse, asyncio, hashlib, hmac, statistics, sys, tempfile, time, uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.outbox import Outbox
+from athena.relay import RelayItem
+from athena.segment_log import FsyncPolicy, SegmentLog
+
+POLICIES = [
+    ("always", FsyncPolicy("always")),
+    ("batch 16 / 2ms", FsyncPolicy("batch", 16, 2)),
+    ("batch 64 / 5ms", FsyncPolicy("batch", 64, 5)),
+    ("batch 256 / 10ms", FsyncPolicy("batch", 256, 10)),
+    ("off", FsyncPolicy("off")),
+]
+
+
+async def run(policy: FsyncPolicy, records: int, producers: int, body: bytes) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = Outbox(SegmentLog(Path(tmp), "outbox", policy=policy))
+        await outbox.open()
+        latencies = []
+        per_producer = records // producers
+        signature = hmac.new(b"bench", body, hashlib.sha256).hexdigest()  # relayed as received, like /cap
+
+        async def producer():
+            for _ in range(per_producer):
+                t0 = time.perf_counter()
+                await outbox.put(RelayItem(str(uuid.uuid4()), body, signature))
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(producer() for _ in range(producers)))
+        elapsed = time.perf_counter() - t0
+        stats = outbox.stats()
+        await outbox.close()
+
+    latencies.sort()
+    return {
+        "rate": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "fsyncs": stats["fsyncs"],
+        "mean_batch": stats["mean_batch"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--producers", type=int, default=64)
+    args = parser.parse_args()
+    body = (BASE_DIR / "cap_record.json").read_bytes()
+
+    print(f"⏱ Outbox intake: {args.records} CAPs of {len(body)} B, {args.producers} concurrent producers")
+    print(f"{'policy':<20}{'puts/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'fsyncs':>9}{'batch':>8}")
+    for label, policy in POLICIES:
+        r = asyncio.run(run(policy, args.records, args.producers, body))
+        print(f"{label:<20}{r['rate']:>10.0f}{r['p50']:>9.2f}{r['p99']:>9.2f}{r['fsyncs']:>9}{r['mean_batch']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Relay batching benchmark against the local stand-in bridge.
+Relays the same CAPs per item (POST /cap) and through BatchRelay at batch
+sizes 1/10/100, and reports CAPs/s and bridge requests made.
+
+    python scripts/bench_relay_batch.py --caps 5000 --latency-ms 2
+"""
+
+import argparse, asyncio, json, sys, time, uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.relay import RelayClient, RelayConfig, RelayItem
+from athena.relay_batch import BatchConfig, BatchRelay
+import stub_bridge
+
+
+async def run(label: str, batch_size: int, caps: int, concurrency: int, latency_ms: float, fmt: str):
+    runner, url, stats = await stub_bridge.start(latency_ms=latency_ms)
+    client = RelayClient(RelayConfig(bridge_url=url, pool_size=20))
+    await client.start()
+    relay = client
+    if batch_size:
+        relay = BatchRelay(client, BatchConfig(max_items=batch_size, linger_ms=5, format=fmt))
+        await relay.start()
+
+    cap = json.loads((BASE_DIR / "cap_record.json").read_text(encoding="utf-8"))
+    body = json.dumps(cap, separators=(",", ":")).encode("utf-8")
+    remaining = iter(range(caps))
+    failures = 0
+
+    async def producer():
+        nonlocal failures
+        for _ in remaining:
+            result = await relay.relay(RelayItem(str(uuid.uuid4()), body))
+            failures += result["relay"] != "success"
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(producer() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    if batch_size:
+        await relay.close()
+    await client.close()
+    await runner.cleanup()
+    print(f"{label:<18}{caps / elapsed:>10.0f}{stats['requests']:>12}{failures:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--caps", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    args = parser.parse_args()
+
+    print(f"⏱ Relaying {args.caps} CAPs, {args.concurrency} concurrent senders, "
+          f"bridge latency {args.latency_ms} ms, {args.format} batches")
+    print(f"{'mode':<18}{'CAPs/s':>10}{'requests':>12}{'failures':>10}")
+    for label, size in [("per-item /cap", 0), ("batch 1", 1), ("batch 10", 10), ("batch 100", 100)]:
+        asyncio.run(run(label, size, args.caps, args.concurrency, args.latency_ms, args.format))
+
+
+if __name__ == "__main__":
+    main()
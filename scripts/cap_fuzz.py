@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAP payload generators for differential checks and benchmarks.
+make_cap() builds schema-valid CAPs of a chosen size; fuzz_caps() derives
+mostly-invalid variants by deleting, adding and retyping fields.
+"""
+
+import copy, json, random, uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CAP_FILE = BASE_DIR / "cap_record.json"
+
+CONFIDENCE = ["Low", "Med", "High"]
+CONTEXT_MODES = ["Evidence Engine", "Advisor", "Mythic", "Technical",
+                 "Executive", "Board", "Regulator", "Underwriter"]
+VOCAB = CONFIDENCE + CONTEXT_MODES + [
+    "HUMAN", "human", "file", "web", "calculation", "reasoning", "low", "moderate", "high",
+    "unsigned", "pending", "sealed", "validated", "", "2026-01-17T00:00:00Z",
+    "2026-01-17 00:00:00", "not-a-date", "123e4567-e89b-12d3-a456-426614174000",
+    "123e4567-e89b-12d3-a456-42661417400", "zzze4567-e89b-12d3-a456-426614174000",
+]
+
+
+# --- Valid payloads ---------------------------------------------------------
+def make_cap(evidence: int = 1, trace: int = 0, detections: int = 0, signals: int = 0,
+             rng: random.Random = None) -> dict:
+    """A schema-valid CAP with the given array sizes (extensions omitted when 0)."""
+    rng = rng or random.Random(0)
+    with open(CAP_FILE, encoding="utf-8") as f:
+        cap = json.load(f)
+    cap["cap_id"] = str(uuid.UUID(int=rng.getrandbits(128)))
+    cap["context_mode"] = rng.choice(CONTEXT_MODES)
+    cap["outputs"]["evidence"] = [{
+        "claim": f"Claim {i} holds under the stated assumptions.",
+        "support": f"Supported by observation set {i}.",
+        "source_type": rng.choice(["file", "web", "calculation", "reasoning"]),
+        "source_ref": f"/evidence/{i}.json",
+    } for i in range(evidence)]
+
+    ext = {}
+    if trace:
+        ext["CAP_EXT13_DecisionTraceLedger"] = {"enabled": True, "trace": [{
+            "step": i + 1,
+            "inputs": [f"input-{i}-a", f"input-{i}-b"],
+            "method": "weighted review",
+            "output": f"intermediate result {i}",
+            "assumptions": ["inputs are current"],
+            "confidence": rng.choice(CONFIDENCE),
+        } for i in range(trace)]}
+        ext["CAP_EXT14_RiskEconomicsEngine"] = {
+            "enabled": True, "models_used": ["loss-v2"],
+            "loss_estimates": {"ethical_risk": 0.1, "operational_risk": 0.25, "public_trust_risk": 3},
+        }
+        ext["CAP_EXT16_ContextGuard"] = {"enabled": False, "trigger_count": 0, "last_trigger_reason": "none"}
+    if signals:
+        ext["CAP_EXT15_HumanFailureModeAnalyzer"] = {"enabled": True, "signals_detected": [{
+            "signal": f"signal-{i}", "severity": rng.choice(["low", "moderate", "high"]),
+            "description": "Observed during review.",
+        } for i in range(signals)]}
+    if detections:
+        ext["CAP_EXT17_CivicSensitivityPass"] = {"enabled": True, "annotations": ["reviewed"], "detections": [{
+            "topic": f"topic-{i}", "contextualized": bool(i % 2),
+            "timestamp": "2026-01-17T00:00:00Z", "annotation": "context supplied",
+        } for i in range(detections)]}
+    cap["cap_extensions"] = ext
+    return cap
+
+
+# --- Mutations --------------------------------------------------------------
+def _slots(node, out):
+    """Collect every (container, key) pair reachable from node."""
+    if isinstance(node, dict):
+        for k, v in node.items():
+            out.append((node, k))
+            _slots(v, out)
+    elif isinstance(node, list):
+        for i, v in enumerate(node):
+            out.append((node, i))
+            _slots(v, out)
+    return out
+
+def _random_value(rng: random.Random):
+    return rng.choice([
+        lambda: rng.choice(VOCAB),
+        lambda: rng.randint(-3, 3),
+        lambda: rng.choice([0.0, 1.0, 2.5, -1.5]),
+        lambda: rng.choice([True, False]),
+        lambda: None,
+        lambda: [],
+        lambda: [rng.choice(VOCAB)],
+        lambda: {},
+        lambda: {"unexpected": rng.choice(VOCAB)},
+    ])()
+
+def mutate(cap: dict, rng: random.Random) -> dict:
+    cap = copy.deepcopy(cap)
+    slots = _slots(cap, [])
+    if not slots:
+        return cap
+    container, key = rng.choice(slots)
+    op = rng.random()
+    if op < 0.25 and isinstance(container, dict):
+        del container[key]
+    elif op < 0.4:
+        target = container if isinstance(container, dict) else cap
+        target[rng.choice(["extra", "note", "cap_id", "step", "enabled"])] = _random_value(rng)
+    else:
+        container[key] = _random_value(rng)
+    return cap
+
+def fuzz_caps(n: int, seed: int = 0):
+    """Yield n CAPs: roughly a fifth untouched, the rest with 1–3 random mutations."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        cap = make_cap(evidence=rng.randint(0, 4), trace=rng.randint(0, 3),
+                       detections=rng.randint(0, 2), signals=rng.randint(0, 2), rng=rng)
+        if rng.random() > 0.2:
+            for _ in range(rng.randint(1, 3)):
+                cap = mutate(cap, rng)
+        yield cap
@@ -7,9 +7,11 @@ Hardened for FalconForge production deployment.
 
 import json, hashlib, os, sys, datetime, shutil, traceback, urllib.request, ssl
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.validation import VALIDATORS
 SCHEMAS_DIR = BASE_DIR / "schemas"
 ARCHIVE_DIR = BASE_DIR / "archive" / "CAP_LOGS"
 CAP_FILE = BASE_DIR / "cap_record.json"
@@ -75,9 +77,10 @@ def main():
             if local_hash != canon_hash:
                 raise ValueError("Post-fetch hash still mismatch.")
 
-        schema = load_json(SCHEMA_PATH)
+        validator = VALIDATORS.get(load_json(SCHEMA_PATH), local_hash)
         cap = load_json(CAP_FILE)
-        validate(instance=cap, schema=schema)
+        validator.validate(cap)
+        log(f"⏱ Validator built in {validator.build_ms:.1f} ms, CAP validated in {validator.last_ms:.2f} ms")
 
         verdict, status = "✅ Integrity Verified — Hashes Match + CAP Valid.", "PASS"
         log(verdict)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conformance check: strict pydantic CAP model tree vs reference jsonschema.
+Feeds fuzzed CAPs (as JSON bytes, through model_validate_json) and hand-picked
+edge cases to both and reports every verdict disagreement; --bench also times
+the single pass against the current json.loads + CAPPayload + validate path.
+
+    python scripts/model_conformance.py --cases 5000 --bench
+"""
+
+import argparse, copy, json, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.codegen import default_cache_dir, load_compiled_validator
+from athena.models import CAPPayload
+from athena.schema_models import ModelCAPValidator
+from athena.validation import VALIDATORS
+from cap_fuzz import fuzz_caps, make_cap
+
+SCHEMA_PATH = BASE_DIR / "schemas" / "ATHENA_CAP_SCHEMA_v3_5.json"
+MANIFEST_PATH = BASE_DIR / "schemas" / "FalconForge_Integrity_Manifest_v3_5.json"
+
+
+def edge_cases():
+    """Spots where pydantic and JSON Schema semantics differ by default."""
+    base = make_cap(evidence=1, trace=2, detections=1, signals=1)
+    ledger = ("cap_extensions", "CAP_EXT13_DecisionTraceLedger", "trace", 0)
+
+    def with_value(path, value):
+        cap = copy.deepcopy(base)
+        node = cap
+        for part in path[:-1]:
+            node = node[part]
+        node[path[-1]] = value
+        return cap
+
+    yield "integral float step", with_value(ledger + ("step",), 1.0)
+    yield "fractional step", with_value(ledger + ("step",), 1.5)
+    yield "bool step", with_value(ledger + ("step",), True)
+    yield "step below minimum", with_value(ledger + ("step",), 0)
+    yield "null optional confidence", with_value(ledger + ("confidence",), None)
+    yield "int risk estimate", with_value(("cap_extensions", "CAP_EXT14_RiskEconomicsEngine",
+                                           "loss_estimates", "ethical_risk"), 2)
+    yield "bool risk estimate", with_value(("cap_extensions", "CAP_EXT14_RiskEconomicsEngine",
+                                            "loss_estimates", "ethical_risk"), False)
+    yield "cap_id trailing newline", with_value(("cap_id",), base["cap_id"] + "\n")
+    yield "numeric string domain", with_value(("domain",), 12)
+    yield "extra signal field (allowed)", with_value(("cap_extensions", "CAP_EXT15_HumanFailureModeAnalyzer",
+                                                      "signals_detected", 0, "extra"), 1)
+    yield "extra evidence field (forbidden)", with_value(("outputs", "evidence", 0, "extra"), 1)
+    yield "unknown extension", with_value(("cap_extensions", "CAP_EXT99"), {})
+    yield "free-form audit_context", with_value(("cap_extensions", "bridge_metadata"), {
+        "bridge_version": "2", "validated_at": "2026-01-17T00:00:00Z", "validator_id": "v",
+        "validation_signature": "s", "audit_context": {"anything": [1, None]}})
+    yield "top-level array", [base]
+
+
+def conformance(reference, model: ModelCAPValidator, cases: int, seed: int, show: int) -> int:
+    named = [(f"fuzz {i}", cap) for i, cap in enumerate(fuzz_caps(cases, seed))] + list(edge_cases())
+    disagreements, valid = [], 0
+    for label, cap in named:
+        expected = reference.is_valid(cap)
+        check = model.check(json.dumps(cap).encode("utf-8"))
+        valid += expected
+        if (check["status"] == 200) != expected:
+            disagreements.append((label, expected, check, cap))
+
+    print(f"🧪 {cases} fuzzed CAPs (seed {seed}) + {len(named) - cases} edge cases: "
+          f"{valid} valid, {len(named) - valid} invalid")
+    for label, expected, check, cap in disagreements[:show]:
+        print(f"❌ {label}: jsonschema={'valid' if expected else 'invalid'} "
+              f"pydantic={check['status']} {check.get('error', '')}")
+        print("   " + json.dumps(cap)[:400])
+    if disagreements:
+        print(f"❌ {len(disagreements)} disagreement(s)")
+    else:
+        print("✅ Single-pass model and jsonschema agree on every case.")
+    return len(disagreements)
+
+
+def two_step(validator):
+    def run(body: bytes):
+        data = json.loads(body)
+        CAPPayload(**data)
+        validator.validate(data)
+    return run
+
+
+def _time(fn, body, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(body)
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def bench(reference, compiled, model: ModelCAPValidator):
+    print("\n⏱ Parse + validate per CAP, from bytes (µs)")
+    paths = [("jsonschema", two_step(reference))]
+    if compiled is not None:
+        paths.append(("compiled", two_step(compiled)))
+    paths.append(("single-pass", model.check))
+    print(f"{'payload':<28}" + "".join(f"{label:>13}" for label, _ in paths))
+    sizes = [("cap_record.json", dict(evidence=1), 2000),
+             ("evidence=50 trace=50", dict(evidence=50, trace=50, detections=10, signals=10), 200),
+             ("evidence=1000 trace=1000", dict(evidence=1000, trace=1000, detections=200, signals=200), 10)]
+    for label, size, rounds in sizes:
+        body = json.dumps(make_cap(**size)).encode("utf-8")
+        print(f"{label:<28}" + "".join(f"{_time(fn, body, rounds):>13.1f}" for _, fn in paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=10, help="disagreements to print")
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    reference = VALIDATORS.load(SCHEMA_PATH)
+    model = ModelCAPValidator(reference.schema, reference.schema_hash)
+    print(f"🔧 Model tree built in {model.build_ms:.1f} ms")
+    failures = conformance(reference, model, args.cases, args.seed, args.show)
+    if args.bench:
+        compiled = load_compiled_validator(SCHEMA_PATH, MANIFEST_PATH, default_cache_dir(BASE_DIR))
+        bench(reference, compiled, model)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conformance check: IdempotencyCache singleflight.
+Identical requests in flight together share one computation; a follower gets
+the leader's result (or its error), and when the leader is cancelled (client
+disconnect) a live follower computes the result itself instead of failing.
+
+    python scripts/singleflight_check.py
+"""
+
+import asyncio, sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.idempotency import IdempotencyCache, idempotency_key
+
+BODY = b'{"cap_id": "singleflight-check"}'
+SIGNATURE = "a" * 64
+
+
+class Computation:
+    """compute() for IdempotencyCache.run that counts calls and can be held open."""
+
+    def __init__(self, result=(200, {"status": "CAP validated"}, True), error: Exception = None):
+        self.result, self.error = result, error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def coalesced() -> list:
+    cache, compute = IdempotencyCache(), Computation()
+    key = idempotency_key(BODY)
+    leader = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    follower = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    await asyncio.sleep(0)
+    compute.release.set()
+    results = await asyncio.gather(leader, follower)
+    failures = []
+    if compute.calls != 1:
+        failures.append(f"coalesced: compute ran {compute.calls} times, expected 1")
+    if [r[2] for r in results] != [False, True]:
+        failures.append(f"coalesced: replayed flags {[r[2] for r in results]}, expected [False, True]")
+    return failures
+
+
+async def leader_error() -> list:
+    cache, compute = IdempotencyCache(), Computation(error=ValueError("bad CAP"))
+    key = idempotency_key(BODY)
+    leader = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    follower = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    await asyncio.sleep(0)
+    compute.release.set()
+    results = await asyncio.gather(leader, follower, return_exceptions=True)
+    if not all(isinstance(r, ValueError) for r in results):
+        return [f"leader error: expected ValueError for both, got {results!r}"]
+    return []
+
+
+async def leader_cancelled() -> list:
+    cache, compute = IdempotencyCache(), Computation()
+    key = idempotency_key(BODY)
+    leader = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    follower = asyncio.create_task(cache.run(key, SIGNATURE, compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    compute.release.set()
+    failures = []
+    try:
+        await leader
+        failures.append("leader cancelled: leader was not cancelled")
+    except asyncio.CancelledError:
+        pass
+    try:
+        status, content, replayed = await asyncio.wait_for(follower, 5)
+    except BaseException as e:
+        return failures + [f"leader cancelled: follower failed with {e!r}"]
+    if (status, replayed) != (200, False):
+        failures.append(f"leader cancelled: follower got ({status}, replayed={replayed}), expected (200, False)")
+    if compute.calls != 2:
+        failures.append(f"leader cancelled: compute ran {compute.calls} times, expected 2")
+    stats = cache.stats()
+    if stats["inflight"] or stats["abandoned"] != 1 or stats["entries"] != 1:
+        failures.append(f"leader cancelled: stats {stats}")
+    return failures
+
+
+async def run() -> list:
+    failures = []
+    for check in (coalesced, leader_error, leader_cancelled):
+        failures += await check()
+    return failures
+
+
+def main():
+    failures = asyncio.run(run())
+    print("🧪 singleflight: coalesced, leader error, leader cancelled")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Followers share the leader's result or error and take over from a cancelled leader.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Backfill client for /cap/stream.
+Signs each CAP (from an NDJSON file, or fuzzed) with ATHENA_SHARED_SECRET and
+pushes them over one chunked request, reading per-line results as they come.
+
+    python scripts/stream_caps.py --url http://127.0.0.1:8000 --file caps.ndjson
+    python scripts/stream_caps.py --url http://127.0.0.1:8000 --caps 100000
+"""
+
+import argparse, asyncio, hashlib, hmac, json, os, random, sys, time
+from pathlib import Path
+
+import aiohttp
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from cap_fuzz import make_cap
+
+
+def cap_lines(args):
+    if args.file:
+        with open(args.file, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+        return
+    rng = random.Random(args.seed)
+    for _ in range(args.caps):
+        yield json.dumps(make_cap(rng.randint(1, 4), rng.randint(1, 8), rng.randint(0, 4),
+                                  rng.randint(0, 4), rng)).encode("utf-8")
+
+
+async def body(args, secret: bytes, sent: dict):
+    for cap in cap_lines(args):
+        signature = hmac.new(secret, cap, hashlib.sha256).hexdigest().encode("ascii")
+        sent["lines"] += 1
+        yield signature + b"\t" + cap + b"\n"
+
+
+async def run(args):
+    secret = os.getenv("ATHENA_SHARED_SECRET", "").encode()
+    if not secret:
+        sys.exit("❌ ATHENA_SHARED_SECRET is not set")
+    sent = {"lines": 0}
+    statuses = {}
+    t0 = time.perf_counter()
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=args.read_timeout)
+    headers = {"Content-Type": "application/x-ndjson"}
+    if args.key_id:
+        headers["X-Athena-Key-Id"] = args.key_id
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.post(f"{args.url}/cap/stream", data=body(args, secret, sent),
+                                headers=headers) as resp:
+            if resp.status != 200:
+                sys.exit(f"❌ /cap/stream answered {resp.status}: {await resp.text()}")
+            async for raw in resp.content:
+                result = json.loads(raw)
+                if result.get("summary"):
+                    print(f"📦 Summary: {result}")
+                    continue
+                statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+                if result["status"] not in (200, 202) and args.show_errors:
+                    print(f"⚠️ line {result['line']}: {result.get('error')}")
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Streamed {sent['lines']} CAP(s) in {elapsed:.2f}s ({sent['lines'] / elapsed:.0f}/s); statuses {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--file", help="NDJSON file of CAPs (default: fuzzed CAPs)")
+    parser.add_argument("--caps", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--key-id", help="X-Athena-Key-Id of the key in ATHENA_SHARED_SECRET")
+    parser.add_argument("--read-timeout", type=float, default=300.0)
+    parser.add_argument("--show-errors", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conformance check: /cap/stream answers every line, however malformed.
+Runs the app in-process and sends lines with broken signature fields (non-ASCII
+bytes, wrong length, no tab) around valid ones; each must get its own result,
+the valid ones must still be accepted, and the summary line must arrive.
+
+    python scripts/stream_conformance.py
+"""
+
+import hashlib, hmac, json, os, sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from cap_fuzz import make_cap
+
+SECRET = b"stream-conformance"
+
+
+def signed(cap: bytes) -> bytes:
+    return hmac.new(SECRET, cap, hashlib.sha256).hexdigest().encode("ascii")
+
+
+def cases():
+    """(line, expected status), in stream order."""
+    cap = json.dumps(make_cap(evidence=1, trace=2, detections=1, signals=1)).encode("utf-8")
+    yield b"\xff" * 64 + b"\t" + cap, 401               # non-ASCII signature
+    yield signed(cap) + b"\t" + cap, 200
+    yield signed(cap)[:40] + b"\t" + cap, 401           # truncated signature
+    yield "é".encode("utf-8") * 32 + b"\t" + cap, 401   # 64 bytes, not hex
+    yield cap, 401                                      # no signature field
+    yield signed(cap) + b"\t" + cap, 200
+
+
+def main():
+    os.environ["ATHENA_SHARED_SECRET"] = SECRET.decode()
+    os.environ.pop("BRIDGE_URL", None)
+    os.environ.pop("ATHENA_REQUIRE_REPLAY_PROTECTION", None)
+    os.chdir(BASE_DIR)
+    from fastapi.testclient import TestClient
+    import app as athena_app
+
+    expected = list(cases())
+    body = b"".join(line + b"\n" for line, _ in expected)
+    with TestClient(athena_app.app) as client:
+        resp = client.post("/cap/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    replies = [json.loads(line) for line in resp.text.splitlines() if line.strip()]
+    results = {r["line"]: r["status"] for r in replies if not r.get("summary")}
+    summary = next((r for r in replies if r.get("summary")), None)
+
+    failures = []
+    for line_no, (_, status) in enumerate(expected, 1):
+        if results.get(line_no) != status:
+            failures.append(f"line {line_no}: expected {status}, got {results.get(line_no)}")
+    accepted = sum(1 for _, status in expected if status == 200)
+    if summary is None:
+        failures.append("no summary line")
+    elif (summary["lines"], summary["accepted"]) != (len(expected), accepted):
+        failures.append(f"summary {summary}")
+
+    print(f"🧪 {len(expected)} stream lines, HTTP {resp.status_code}, {len(results)} result(s)")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Every line answered, valid lines accepted, summary received.")
+
+
+if __name__ == "__main__":
+    main()
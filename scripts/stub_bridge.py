@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the Athena CAP bridge, for relay benchmarks and manual runs.
+Accepts POST /cap (one CAP) and POST /cap/batch (JSON array or NDJSON of CAP envelopes) and
+answers like the real bridge after an optional fixed latency.
+
+    python scripts/stub_bridge.py --port 8765 --latency-ms 5
+    BRIDGE_URL=http://127.0.0.1:8765 python -m uvicorn app:app
+"""
+
+import argparse, asyncio, json
+
+from aiohttp import web
+
+
+def make_app(latency_ms: float = 0.0) -> web.Application:
+    stats = {"requests": 0, "caps": 0, "bytes": 0}
+
+    async def receive_one(request: web.Request) -> web.Response:
+        body = await request.read()
+        await asyncio.sleep(latency_ms / 1000)
+        stats["requests"] += 1
+        stats["caps"] += 1
+        stats["bytes"] += len(body)
+        return web.json_response({"status": 200, "accepted": 1})
+
+    async def receive_batch(request: web.Request) -> web.Response:
+        body = await request.read()
+        if request.content_type == "application/x-ndjson":
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+        await asyncio.sleep(latency_ms / 1000)
+        stats["requests"] += 1
+        stats["caps"] += len(items)
+        stats["bytes"] += len(body)
+        # one {"trace_id", "signature", "cap"} envelope per CAP
+        return web.json_response({"results": [
+            {"trace_id": item.get("trace_id"), "status": 200,
+             "cap_id": item["cap"].get("cap_id") if isinstance(item.get("cap"), dict) else None}
+            for item in items
+        ]})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=64 << 20)
+    app["stats"] = stats
+    app.router.add_post("/cap", receive_one)
+    app.router.add_post("/cap/batch", receive_batch)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+async def start(port: int = 0, latency_ms: float = 0.0):
+    """Start in the running loop; returns (runner, base_url, stats)."""
+    app = make_app(latency_ms)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    bound = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{bound}", app["stats"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency_ms), host="127.0.0.1", port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
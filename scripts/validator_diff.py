@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Differential check: generated CAP validator vs reference jsonschema.
+Runs both over fuzzed CAPs and reports every verdict disagreement;
+--bench also times both on small and large CAPs.
+
+    python scripts/validator_diff.py --cases 5000 --bench
+"""
+
+import argparse, json, sys, time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+from athena.validation import VALIDATORS
+from athena.codegen import load_compiled_validator, default_cache_dir
+from cap_fuzz import fuzz_caps, make_cap
+
+SCHEMA_PATH = BASE_DIR / "schemas" / "ATHENA_CAP_SCHEMA_v3_5.json"
+MANIFEST_PATH = BASE_DIR / "schemas" / "FalconForge_Integrity_Manifest_v3_5.json"
+
+
+def differential(reference, compiled, cases: int, seed: int, show: int) -> int:
+    disagreements, valid = [], 0
+    for i, cap in enumerate(fuzz_caps(cases, seed)):
+        expected = reference.is_valid(cap)
+        try:
+            compiled.validate(cap)
+            got, message = True, None
+        except Exception as e:
+            got, message = False, getattr(e, "message", repr(e))
+        valid += expected
+        if got != expected:
+            disagreements.append((i, expected, got, message, cap))
+
+    print(f"🧪 {cases} fuzzed CAPs (seed {seed}): {valid} valid, {cases - valid} invalid")
+    for i, expected, got, message, cap in disagreements[:show]:
+        print(f"❌ case {i}: jsonschema={'valid' if expected else 'invalid'} "
+              f"compiled={'valid' if got else 'invalid'} ({message})")
+        print("   " + json.dumps(cap)[:400])
+    if disagreements:
+        print(f"❌ {len(disagreements)} disagreement(s)")
+    else:
+        print("✅ Generated and reference validators agree on every case.")
+    return len(disagreements)
+
+
+def _time(fn, cap, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(cap)
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def bench(reference, compiled):
+    print("\n⏱ Validation time per CAP (µs)")
+    print(f"{'payload':<34}{'jsonschema':>12}{'compiled':>12}{'speedup':>10}")
+    sizes = [("cap_record.json", dict(evidence=1), 2000),
+             ("evidence=50 trace=50", dict(evidence=50, trace=50, detections=10, signals=10), 200),
+             ("evidence=1000 trace=1000", dict(evidence=1000, trace=1000, detections=200, signals=200), 10)]
+    for label, size, rounds in sizes:
+        cap = make_cap(**size)
+        ref_us = _time(reference.validate, cap, rounds)
+        gen_us = _time(compiled.validate, cap, rounds)
+        print(f"{label:<34}{ref_us:>12.1f}{gen_us:>12.1f}{ref_us / gen_us:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--show", type=int, default=10, help="disagreements to print")
+    parser.add_argument("--bench", action="store_true")
+    args = parser.parse_args()
+
+    reference = VALIDATORS.load(SCHEMA_PATH)
+    compiled = load_compiled_validator(SCHEMA_PATH, MANIFEST_PATH, default_cache_dir(BASE_DIR))
+    if compiled is None:
+        print("❌ Schema does not match manifest hash; no compiled validator to compare.")
+        sys.exit(1)
+    print(f"🔧 Compiled validator: {compiled.source_path} ({compiled.build_ms:.1f} ms)")
+
+    failures = differential(reference, compiled, args.cases, args.seed, args.show)
+    if args.bench:
+        bench(reference, compiled)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()